@@ -0,0 +1,77 @@
+from __future__ import annotations
+from pathlib import Path
+import os
+import random
+
+# Synthetic, reproducible test data for the benchmarks. Everything is derived from a fixed
+# seed, so two machines benchmark the same bytes.
+
+SEED = 20240601
+
+# bump when the generators change: cached documents are named after it
+VERSION = 1
+
+# text mixes ASCII with accented letters and emoji so "chars" mode really decodes
+_WORDS = ("snap", "balance", "gauntlet", "stone", "titan", "inevitable", "universe", "half",
+          "dust", "garden", "soul", "mind", "time", "space", "reality", "power", "café",
+          "naïve", "Zürich", "señor", "résumé", "🟣", "∞", "—")
+
+# one block of text is generated, then written with a shifting start so a huge file does
+# not repeat at a fixed period (and no filesystem can dedupe it into a few extents)
+_BLOCK_LINES = 1 << 15
+
+FOLDER_EXTS = (".txt", ".log", ".jpg", ".png", ".pdf")
+FILES_PER_DIR = 1000
+
+def _text_block(rng: random.Random) -> list[bytes]:
+    lines = []
+    for _ in range(_BLOCK_LINES):
+        n = rng.choice((0, 3, 8, 12, 12, 20, 40))  # some blank, some long lines
+        lines.append((" ".join(rng.choice(_WORDS) for _ in range(n)) + "\n").encode())
+    return lines
+
+def make_document(path: Path, size: int, seed: int = SEED) -> Path:
+    """Writes a UTF-8 text file of exactly `size` bytes (cut at a line end where possible)."""
+    rng = random.Random(seed)
+    block = _text_block(rng)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".part")
+    written = 0
+    with open(tmp, "wb", buffering=1 << 20) as f:
+        while written < size:
+            start = rng.randrange(_BLOCK_LINES)
+            chunk = b"".join(block[start:] + block[:start])
+            if written + len(chunk) > size:
+                chunk = chunk[:size - written]
+                cut = chunk.rfind(b"\n") + 1
+                # never end in the middle of a UTF-8 sequence
+                chunk = chunk[:cut] if cut else chunk.decode("utf-8", "ignore").encode()
+                chunk += b"x" * (size - written - len(chunk))
+            f.write(chunk)
+            written += len(chunk)
+    os.replace(tmp, path)
+    return path
+
+def document(corpus_dir: Path, size: int) -> Path:
+    """The cached corpus document of `size` bytes, generated on first use."""
+    path = corpus_dir / f"doc_v{VERSION}_{size}.txt"
+    if not path.exists() or path.stat().st_size != size:
+        make_document(path, size)
+    return path
+
+def make_folder(root: Path, files: int, file_size: int = 2048, seed: int = SEED) -> Path:
+    """
+    Creates `files` small files under `root`, FILES_PER_DIR per subfolder, with extensions
+    cycling through FOLDER_EXTS. Sizes vary from half to one and a half `file_size`.
+    """
+    rng = random.Random(seed)
+    payload = rng.randbytes(file_size * 2)
+    for i in range(files):
+        d = root / f"d{i // FILES_PER_DIR:04d}"
+        if i % FILES_PER_DIR == 0:
+            d.mkdir(parents=True, exist_ok=True)
+        n = file_size // 2 + rng.randrange(file_size + 1)
+        off = rng.randrange(len(payload) - n + 1)
+        with open(d / f"f{i:07d}{FOLDER_EXTS[i % len(FOLDER_EXTS)]}", "wb") as f:
+            f.write(payload[off:off + n])
+    return root
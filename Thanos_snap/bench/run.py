@@ -0,0 +1,272 @@
+"""
+Benchmarks for document and folder snaps on synthetic data (see bench/corpus.py).
+
+    python -m bench.run                                  (quick suite, a few minutes)
+    python -m bench.run --suite full --work /big/disk    (1 MB - 4 GB documents, 1k - 1M files)
+    python -m bench.run --sizes 64M --modes lines --strengths 50
+    python -m bench.run --baseline bench-before.jsonl    (run, then compare)
+    python -m bench.run --compare bench-before.jsonl bench-after.jsonl
+
+Every case runs in a fresh process, on a fresh copy of its data, with an empty cache dir
+(so the line index is built cold). Planning, backup and execution are timed separately;
+each result line has their seconds and throughput (MB/s for documents, files/s for
+folders) plus the process's peak RSS. Imports (numpy included) are warmed up before the
+first timer starts. Folder snaps trash into a Trash inside the work dir, never the user's;
+that Trash is only redirectable where it follows XDG_DATA_HOME, so folder cases are
+skipped on macOS and Windows.
+
+Results are JSON lines: a "meta" line, then one line per case (with an "error" instead of
+timings when the case failed; the run goes on). Comparing flags every phase that got
+slower than the baseline by more than --tolerance (phases under --min-seconds are noise
+and never flagged); the exit status is 1 when any did, or any case failed.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from bench import corpus
+
+SUITES = {
+    "quick": {"sizes": ["1M", "16M"], "files": [1000, 10000], "strengths": [10, 50, 90]},
+    "full": {"sizes": ["1M", "64M", "1G", "4G"], "files": [1000, 10000, 100000, 1000000],
+             "strengths": [10, 50, 90]},
+}
+MODES = ("lines", "chars", "bytes")
+PHASES = ("plan", "backup", "execute")
+
+# send2trash puts files in the user's own Trash / Recycle Bin here, whatever XDG_DATA_HOME says
+_NO_SCRATCH_TRASH = sys.platform in ("darwin", "win32")
+
+# regressions smaller than this are not reported
+DEFAULT_TOLERANCE = 0.20
+DEFAULT_MIN_SECONDS = 0.05
+
+_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+def parse_size(s: str) -> int:
+    s = s.strip().upper().removesuffix("B")
+    if s and s[-1] in _UNITS:
+        return int(float(s[:-1]) * _UNITS[s[-1]])
+    return int(s)
+
+def _cases(sizes: list[str], files: list[int], modes: list[str], strengths: list[int],
+           backup_mode: str, trash_workers: int = 1) -> list[dict]:
+    cases = []
+    for size in sizes:
+        for mode in modes:
+            for s in strengths:
+                cases.append({"name": f"doc-{mode}-{size}-s{s}", "kind": "document", "mode": mode,
+                              "size": parse_size(size), "strength": s, "backup_mode": backup_mode})
+    for n in files:
+        for s in strengths:
+            cases.append({"name": f"folder-{n}-s{s}", "kind": "folder", "files": n, "strength": s,
+                          "backup_mode": backup_mode, "trash_workers": trash_workers})
+    return cases
+
+# -- one case, in its own process --
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)  # bytes on macOS, KB elsewhere
+
+def _timed(phases: dict, name: str, fn):
+    t0 = time.perf_counter()
+    out = fn()
+    phases[name] = {"s": round(time.perf_counter() - t0, 4)}
+    return out
+
+def _backup_folder(plan, folder: Path, backup_dir: Path, backup_mode: str):
+    # the same backups jobs.run_folder_snap makes, without the trashing they overlap with there
+    from core.backup import backup_folder_files
+    from core.backup_archive import ArchiveBackup
+    from core.backup_store import store_backup
+    if backup_mode == "store":
+        return store_backup(plan.selected, backup_dir, root=folder)
+    if backup_mode == "archive":
+        arch = ArchiveBackup(plan.selected, backup_dir, root=folder).start()
+        for _ in arch.flushed():
+            pass
+        return arch.finish()
+    return backup_folder_files(plan.selected, backup_dir, root=folder, allow_hardlink=True)
+
+def _warm_up() -> None:
+    # everything the timed phases would otherwise import lazily on their first call
+    import core.backup_archive  # noqa: F401
+    import core.backup_pipeline  # noqa: F401
+    import core.backup_store  # noqa: F401
+    from core.selection import optional_numpy
+    optional_numpy()
+    if not _NO_SCRATCH_TRASH:
+        import send2trash  # noqa: F401
+
+def _run_case(case: dict, work: Path) -> dict:
+    from core import jobs, snap_file, snap_folder
+    from core.selection import Selector
+
+    _warm_up()
+
+    run_dir, backup_dir = work / "run", work / "backups"
+    for d in (run_dir, backup_dir, work / "cache"):
+        shutil.rmtree(d, ignore_errors=True)
+    rss_before = _peak_rss_mb()
+    selector = Selector(corpus.SEED)
+    phases: dict = {}
+
+    if case["kind"] == "document":
+        doc = run_dir / "doc.txt"
+        run_dir.mkdir(parents=True)
+        shutil.copyfile(corpus.document(work / "corpus", case["size"]), doc)
+        plan = _timed(phases, "plan", lambda: snap_file.make_plan(doc, case["strength"], case["mode"], selector))
+        _timed(phases, "backup", lambda: jobs.backup_document(doc, backup_dir, case["backup_mode"]))
+        removed, kept = _timed(phases, "execute", lambda: snap_file.execute(
+            doc, case["strength"], case["mode"], plan=plan))
+        for p in phases.values():
+            p["mb_s"] = round(case["size"] / (1 << 20) / p["s"], 1) if p["s"] else None
+        counts = {"total": plan.total, "removed": removed, "kept": kept}
+    else:
+        folder = corpus.make_folder(run_dir / "folder", case["files"])
+        plan = _timed(phases, "plan", lambda: snap_folder.make_plan(
+            folder, case["strength"], None, recursive=True, selector=selector))
+        _timed(phases, "backup", lambda: _backup_folder(plan, folder, backup_dir, case["backup_mode"]))
+        deleted, failed = _timed(phases, "execute", lambda: snap_folder.execute(
+            folder, case["strength"], None, plan=plan, recursive=True, workers=case["trash_workers"]))
+        for name, p in phases.items():
+            n = plan.total if name == "plan" else plan.to_remove
+            p["files_s"] = round(n / p["s"], 1) if p["s"] else None
+        counts = {"total": plan.total, "deleted": deleted, "failed": failed}
+
+    result = {**case, "phases": phases, "counts": counts, "rss_before_mb": rss_before,
+              "peak_rss_mb": _peak_rss_mb()}
+    for d in (run_dir, backup_dir):
+        shutil.rmtree(d, ignore_errors=True)
+    return result
+
+# -- results --
+
+def _meta() -> dict:
+    try:
+        import numpy
+        np_version = numpy.__version__
+    except ImportError:
+        np_version = None
+    return {"meta": {"created": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+                     "platform": platform.platform(), "cpus": os.cpu_count(), "numpy": np_version,
+                     "corpus_version": corpus.VERSION}}
+
+def load_results(path: Path) -> dict[str, dict]:
+    """Case name -> result line (cases that failed are left out)."""
+    out = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            if "name" in row and "error" not in row:
+                out[row["name"]] = row
+    return out
+
+def compare(baseline: dict[str, dict], current: dict[str, dict], tolerance: float = DEFAULT_TOLERANCE,
+            min_seconds: float = DEFAULT_MIN_SECONDS, out=sys.stdout) -> int:
+    """Prints each shared case's phase times against the baseline; returns how many regressed."""
+    regressions = 0
+    out.write(f"{'case':<28}{'phase':<9}{'base s':>10}{'now s':>10}{'ratio':>8}\n")
+    for name in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[name]["phases"], current[name]["phases"]
+        for phase in PHASES:
+            if phase not in old or phase not in new:
+                continue
+            a, b = old[phase]["s"], new[phase]["s"]
+            ratio = b / a if a else float("inf")
+            slower = ratio > 1 + tolerance and b >= min_seconds
+            regressions += slower
+            out.write(f"{name:<28}{phase:<9}{a:>10.3f}{b:>10.3f}{ratio:>8.2f}{'  SLOWER' if slower else ''}\n")
+        a, b = baseline[name].get("peak_rss_mb"), current[name].get("peak_rss_mb")
+        if a and b and b > a * (1 + tolerance):
+            regressions += 1
+            out.write(f"{name:<28}{'rss MB':<9}{a:>10.1f}{b:>10.1f}{b / a:>8.2f}  MORE MEMORY\n")
+    for name in sorted(baseline.keys() - current.keys()):
+        out.write(f"{name:<28}(not run)\n")
+    return regressions
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.run", description="Thanos Snap benchmarks.")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--sizes", help="document sizes, e.g. 1M,64M,1G (default: the suite's)")
+    parser.add_argument("--files", help="folder sizes in files, e.g. 1000,100000 (default: the suite's)")
+    parser.add_argument("--modes", default=",".join(MODES), help="document modes (default: all)")
+    parser.add_argument("--strengths", help="e.g. 10,50,90 (default: the suite's)")
+    parser.add_argument("--backup-mode", choices=("copies", "store", "archive"), default="copies")
+    parser.add_argument("--trash-workers", type=int, default=1, help="threads trashing a folder snap's files")
+    parser.add_argument("--only", help="run only cases whose name contains this")
+    parser.add_argument("--work", type=Path, default=Path(tempfile.gettempdir()) / "thanos_bench",
+                        help="scratch dir; the generated corpus is kept here between runs")
+    parser.add_argument("--out", type=Path, help="results file (default: bench-<time>.jsonl)")
+    parser.add_argument("--baseline", type=Path, help="compare the results with this earlier run")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("BASELINE", "RESULTS"),
+                        help="only compare two results files")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--min-seconds", type=float, default=DEFAULT_MIN_SECONDS)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return 1 if compare(*(load_results(p) for p in args.compare), args.tolerance, args.min_seconds) else 0
+
+    suite = SUITES[args.suite]
+    split = lambda s: [x for x in s.split(",") if x]
+    cases = _cases(split(args.sizes) if args.sizes else suite["sizes"],
+                   [int(x) for x in split(args.files)] if args.files else suite["files"],
+                   split(args.modes),
+                   [int(x) for x in split(args.strengths)] if args.strengths else suite["strengths"],
+                   args.backup_mode, args.trash_workers)
+    if args.only:
+        cases = [c for c in cases if args.only in c["name"]]
+    if _NO_SCRATCH_TRASH and any(c["kind"] == "folder" for c in cases):
+        print(f"skipping folder cases: they would fill your own Trash on {sys.platform}", file=sys.stderr)
+        cases = [c for c in cases if c["kind"] != "folder"]
+
+    work = args.work.expanduser().resolve()
+    work.mkdir(parents=True, exist_ok=True)
+    # children inherit these: caches start empty, and trashed files stay in the work dir
+    os.environ["XDG_CACHE_HOME"] = str(work / "cache")
+    os.environ["XDG_DATA_HOME"] = str(work / "xdg")
+    out_path = args.out or Path(f"bench-{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    failures = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        out.write(json.dumps(_meta()) + "\n")
+        for case in cases:
+            # one process per case, so peak RSS is the case's own
+            try:
+                with ctx.Pool(1, maxtasksperchild=1) as pool:
+                    row = pool.apply(_run_case, (case, work))
+            except Exception as e:  # one broken case must not lose the rest of the run
+                row = {**case, "error": f"{type(e).__name__}: {e}"}
+            shutil.rmtree(work / "xdg", ignore_errors=True)
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+            if "error" in row:
+                failures += 1
+                print(f"{row['name']:<28}FAILED  {row['error']}", flush=True)
+                continue
+            results[row["name"]] = row
+            rates = "  ".join(f"{ph} {p['s']:.3f}s" for ph, p in row["phases"].items())
+            print(f"{row['name']:<28}{rates}  rss {row['peak_rss_mb']} MB", flush=True)
+    print(f"results: {out_path}" + (f" ({failures} cases failed)" if failures else ""))
+    if args.baseline:
+        return 1 if compare(load_results(args.baseline), results, args.tolerance, args.min_seconds) or failures else 0
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
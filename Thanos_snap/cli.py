@@ -0,0 +1,296 @@
+"""
+Headless Thanos Snap: runs a manifest of snap targets without the GUI (cron, SSH).
+Only core modules are imported, never tkinter or Pillow.
+
+    python main.py run jobs.json --confirm "I am inevitable" [--workers 4] [--dry-run] [--metrics FILE]
+
+Manifest (JSON):
+    {
+      "backup_dir": "~/ThanosSnapBackups",   (omit or null: no backups)
+      "backup_mode": "copies",               (copies | store | archive)
+      "trash_workers": 1,                    (parallel deletes within one folder)
+      "doc_workers": null,                   (processes per multi-document target; null: one per core)
+      "secure_random": false,                (true: OS randomness, snaps cannot be reproduced)
+      "metrics_log": null,                   (path: append each target's phase timings as JSON lines)
+      "targets": [
+        {"folder": "/data/share", "strength": 50, "exts": [".log"], "recursive": true},
+        {"folder": "/data/logs", "filter": "size>100M age>30d *.log*", "recursive": true},
+        {"document": "/var/log/app.log", "strength": 30, "modes": ["lines"], "seed": 1234},
+        {"document": ["/var/log/**/*.log", "/tmp/a.txt"], "modes": ["lines", "chars"]}
+      ]
+    }
+
+"document" takes a path, a glob pattern or a list of them. Document "modes": lines,
+chars (decoded characters) and bytes (raw bytes, no decoding). A folder target with
+"streaming": true picks its files without listing the whole folder (huge folders).
+A folder's "filter" narrows the candidates by name glob, re:REGEX, size and age (see
+core/file_filter.py); it applies on top of "exts".
+Every result carries the seed its selection used; putting that "seed" on the target
+makes the same pick again.
+
+One JSON object per target is printed to stdout as soon as it finishes.
+
+Undoing a snap (needs a backup; every snap with one leaves a record in
+<backup_dir>/THANOS_RECORDS):
+
+    python main.py restore ~/ThanosSnapBackups --list
+    python main.py restore ~/ThanosSnapBackups [--target /data/share] [--dry-run]
+    python main.py restore RECORD.json [--workers 8] [--overwrite] [--verify]
+
+Given the backup directory, the newest record (of --target) is restored. A store manifest
+or a folder THANOS_ARCHIVE_*.tar.gz can be given instead of a record.
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import json
+import sys
+import tarfile
+import threading
+import time
+
+from core import jobs, metrics, restore, snap_file, snap_folder
+from core.file_filter import FileFilter, FilterError
+from core.selection import Selector
+from core.utils import confirm_phrase_ok, normalize_exts
+
+DEFAULT_STRENGTH = 50
+
+class ManifestError(ValueError):
+    pass
+
+def _strength(t: dict) -> int:
+    s = t.get("strength", DEFAULT_STRENGTH)
+    if not isinstance(s, int) or not 10 <= s <= 90:
+        raise ManifestError(f"strength must be an integer from 10 to 90, got {s!r}")
+    return s
+
+def _file_filter(t: dict) -> FileFilter | None:
+    return FileFilter.parse(t["filter"]) if t.get("filter") else None
+
+def load_manifest(path: Path) -> dict:
+    try:
+        m = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        raise ManifestError(f"cannot read manifest: {e}") from e
+    if not isinstance(m.get("targets"), list) or not m["targets"]:
+        raise ManifestError("manifest needs a non-empty \"targets\" list")
+    if m.get("backup_mode", "copies") not in jobs.BACKUP_MODES:
+        raise ManifestError(f"backup_mode must be one of {', '.join(jobs.BACKUP_MODES)}")
+    for t in m["targets"]:
+        if not isinstance(t, dict) or ("folder" in t) == ("document" in t):
+            raise ManifestError(f"each target needs exactly one of \"folder\" / \"document\": {t!r}")
+        _strength(t)
+        if not isinstance(t.get("seed", 0), int) or isinstance(t.get("seed"), bool):
+            raise ManifestError(f"seed must be an integer, got {t['seed']!r}")
+        try:
+            _file_filter(t)
+        except FilterError as e:
+            raise ManifestError(f"bad filter {t['filter']!r}: {e}") from None
+        for mode in t.get("modes", ["lines"]) if "document" in t else []:
+            if mode not in ("lines", "chars", "bytes"):
+                raise ManifestError(f"unknown document mode {mode!r}")
+    return m
+
+def _doc_specs(t: dict) -> list[str]:
+    d = t["document"]
+    return [d] if isinstance(d, str) else list(d)
+
+def _target_label(t: dict) -> str:
+    return t["folder"] if "folder" in t else "; ".join(_doc_specs(t))
+
+def _folder_target(t: dict) -> Path:
+    path = Path(t["folder"]).expanduser()
+    if not path.is_dir():
+        raise FileNotFoundError(f"no such folder: {path}")
+    return path
+
+def _document_targets(t: dict) -> list[Path]:
+    docs = jobs.expand_documents(_doc_specs(t))
+    if not docs:
+        raise FileNotFoundError(f"no document matches: {_target_label(t)}")
+    return docs
+
+def _selector(t: dict, m: dict) -> Selector | None:
+    if m.get("secure_random"):
+        return Selector(secure=True)
+    return Selector(t["seed"]) if "seed" in t else None
+
+def _plan_summary(plans: dict) -> dict:
+    return {m: {"total": p.total, "to_remove": p.to_remove, "seed": p.seed, "preview": p.targets_preview}
+            for m, p in plans.items()}
+
+def _preview_target(t: dict, m: dict) -> dict:
+    if "folder" in t:
+        path = _folder_target(t)
+        exts = normalize_exts(t["exts"]) if t.get("exts") else None
+        plan = snap_folder.make_plan(path, _strength(t), exts, bool(t.get("recursive")),
+                                     bool(t.get("streaming")), _selector(t, m), file_filter=_file_filter(t))
+        return {"kind": "folder", "target": str(path), "plans": _plan_summary({"folder": plan})}
+    docs = _document_targets(t)
+    if len(docs) > 1:
+        # planning every document would read them all: list what matched instead
+        return {"kind": "documents", "target": _target_label(t), "documents": len(docs),
+                "matched": [str(d) for d in docs[:20]]}
+    selector = _selector(t, m) or Selector()  # one seed for all modes, as a snap would use
+    plans = {mode: snap_file.make_plan(docs[0], _strength(t), mode, selector) for mode in t.get("modes", ["lines"])}
+    return {"kind": "document", "target": str(docs[0]), "plans": _plan_summary(plans)}
+
+def _run_target(t: dict, m: dict, cancel: threading.Event) -> dict:
+    backup_dir = Path(m["backup_dir"]).expanduser() if m.get("backup_dir") else None
+    backup_mode = m.get("backup_mode", "copies")
+    if "folder" in t:
+        exts = normalize_exts(t["exts"]) if t.get("exts") else None
+        return jobs.run_folder_snap(_folder_target(t), _strength(t), exts, bool(t.get("recursive")),
+                                    backup_dir=backup_dir, backup_mode=backup_mode,
+                                    workers=int(m.get("trash_workers", 1)), cancel=cancel,
+                                    streaming=bool(t.get("streaming")), selector=_selector(t, m),
+                                    file_filter=_file_filter(t))
+    docs = _document_targets(t)
+    modes = t.get("modes", ["lines"])
+    selector = _selector(t, m) or Selector()
+    if len(docs) == 1:
+        return jobs.run_document_snap(docs[0], _strength(t), modes, backup_dir=backup_dir,
+                                      backup_mode=backup_mode, cancel=cancel, selector=selector)
+    res = jobs.run_documents_snap(docs, _strength(t), modes, backup_dir=backup_dir, backup_mode=backup_mode,
+                                  workers=m.get("doc_workers"), cancel=cancel, selector=selector)
+    res["target"] = _target_label(t)
+    if res["errors"]:
+        res["error"] = f"{len(res['errors'])} of {len(docs)} documents failed"
+    return res
+
+def _claims(t: dict) -> list[Path]:
+    """The folder or documents a target snaps, resolved; none if it doesn't resolve (it will fail by itself)."""
+    try:
+        return [_folder_target(t).resolve()] if "folder" in t else [d.resolve() for d in _document_targets(t)]
+    except OSError:
+        return []
+
+def _groups(targets: list[dict]) -> list[list[dict]]:
+    """
+    Splits targets into groups that can run concurrently: targets sharing a document, or a
+    document or folder inside another target's folder (however the paths or globs were
+    written), land in one group, in manifest order.
+    """
+    parent = list(range(len(targets)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner: dict[Path, int] = {}  # claimed path -> first target claiming it
+    folders: list[tuple[Path, int]] = []
+    for i, t in enumerate(targets):
+        for path in _claims(t):
+            if path in owner:
+                parent[find(i)] = find(owner[path])
+            else:
+                owner[path] = i
+            if "folder" in t:
+                folders.append((path, i))
+    for folder, i in folders:
+        for path, j in owner.items():
+            if folder in path.parents:
+                parent[find(i)] = find(j)
+
+    groups: dict[int, list[dict]] = {}
+    for i, t in enumerate(targets):
+        groups.setdefault(find(i), []).append(t)
+    return list(groups.values())
+
+def run_manifest(m: dict, workers: int, dry_run: bool, out=sys.stdout, metrics_log: Path | None = None) -> int:
+    """
+    Runs every target, `workers` at a time; returns the number of failed targets.
+    Each snap's metrics are also appended to `metrics_log` (else the manifest's), if any.
+    """
+    if metrics_log is None and m.get("metrics_log"):
+        metrics_log = Path(m["metrics_log"]).expanduser()
+    # targets touching the same files must not race each other: each group runs in order
+    groups = _groups(m["targets"])
+
+    lock = threading.Lock()
+    cancel = threading.Event()
+    failures = 0
+
+    def emit(rec: dict):
+        nonlocal failures
+        with lock:
+            failures += 0 if rec["ok"] else 1
+            out.write(json.dumps(rec) + "\n")
+            out.flush()
+        if metrics_log is not None and "metrics" in rec:
+            metrics.write_jsonl(metrics_log, {**rec["metrics"], "ok": rec["ok"]})
+
+    def run_group(targets: list[dict]):
+        for t in targets:
+            start = time.perf_counter()
+            try:
+                rec = _preview_target(t, m) if dry_run else _run_target(t, m, cancel)
+                rec["ok"] = "error" not in rec
+            except Exception as e:
+                rec = {"target": _target_label(t), "ok": False, "error": f"{type(e).__name__}: {e}"}
+            rec["seconds"] = round(time.perf_counter() - start, 3)
+            emit(rec)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        try:
+            for fut in [pool.submit(run_group, g) for g in groups]:
+                fut.result()
+        except KeyboardInterrupt:
+            cancel.set()  # running snaps stop safely; documents are left untouched
+            raise
+    return failures
+
+def run_restore(args) -> int:
+    source = args.source.expanduser()
+    try:
+        if args.list:
+            for row in restore.summarize(restore.list_records(source)):
+                print(json.dumps(row))
+            return 0
+        record_path = restore.latest_record(source, args.target) if source.is_dir() else source
+        if record_path is None:
+            print(f"error: no snap record in {source}", file=sys.stderr)
+            return 2
+        record = restore.load_record(record_path)
+        result = restore.restore(record, args.workers, args.overwrite, args.verify, args.dry_run)
+    except (OSError, ValueError, KeyError, EOFError, tarfile.TarError) as e:
+        print(f"error: {type(e).__name__}: {e}", file=sys.stderr)
+        return 2
+    print(json.dumps({"record": str(record_path), **result}))
+    return 1 if result["failed"] or result["missing"] or result["conflicts"] else 0
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="thanos-snap", description="Headless Thanos Snap.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="run a JSON manifest of snap targets")
+    run.add_argument("manifest", type=Path)
+    run.add_argument("--workers", type=int, default=4,
+                     help="targets snapped in parallel (default 4); overlapping targets run one after another")
+    run.add_argument("--dry-run", action="store_true", help="only print each target's plan")
+    run.add_argument("--confirm", default="", help='must be "I am inevitable" unless --dry-run')
+    run.add_argument("--metrics", type=Path, help="append each snap's phase timings to this JSON-lines file")
+    rst = sub.add_parser("restore", help="undo a snap from its backup")
+    rst.add_argument("source", type=Path, help="a snap record, or the backup directory")
+    rst.add_argument("--list", action="store_true", help="list the snap records in the backup directory")
+    rst.add_argument("--target", type=Path, help="with a backup directory: restore this target's newest snap")
+    rst.add_argument("--workers", type=int, default=restore.RESTORE_WORKERS, help="files restored in parallel")
+    rst.add_argument("--overwrite", action="store_true", help="replace files changed since the snap")
+    rst.add_argument("--verify", action="store_true", help="check every restored file's sha256")
+    rst.add_argument("--dry-run", action="store_true", help="only report what would be restored")
+    args = parser.parse_args(argv)
+    if args.command == "restore":
+        return run_restore(args)
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except ManifestError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    if not args.dry_run and not confirm_phrase_ok(args.confirm):
+        print('error: pass --confirm "I am inevitable" to snap (or use --dry-run)', file=sys.stderr)
+        return 2
+    return 1 if run_manifest(manifest, args.workers, args.dry_run, metrics_log=args.metrics) else 0
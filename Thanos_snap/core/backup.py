@@ -1,25 +1,162 @@
 from __future__ import annotations
+from collections import Counter
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import IO, Dict, Optional
+import os
 import shutil
-from core.utils import stamp
+import sys
+from core.utils import check_cancel, stamp
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# ioctl(dst, FICLONE, src): copy-on-write clone on Linux filesystems that support it (btrfs, XFS, ...)
+_FICLONE = 0x40049409
+
+# bytes handed to the kernel per copy_file_range/sendfile call
+_KERNEL_CHUNK = 1 << 30
 
 def ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
-def backup_file(src: Path, backup_dir: Path) -> Path:
-    ensure_dir(backup_dir)
-    dst = backup_dir / f"{src.stem}.THANOS_BACKUP_{stamp()}{src.suffix}"
+def create_unique(directory: Path, base: str, suffix: str, mode: str = "xb") -> tuple[IO, Path]:
+    """
+    Creates and opens <base><suffix> in `directory`, else <base>-1<suffix>, <base>-2<suffix>, ...
+    (several snaps can share a stamp). `mode` is an exclusive-create open() mode.
+    """
+    ensure_dir(directory)
+    n = 0
+    while True:
+        path = directory / (f"{base}{suffix}" if n == 0 else f"{base}-{n}{suffix}")
+        try:
+            return open(path, mode, encoding=None if "b" in mode else "utf-8"), path
+        except FileExistsError:
+            n += 1
+
+def create_unique_dir(directory: Path, base: str) -> Path:
+    """Creates the folder <base> in `directory`, else <base>-1, <base>-2, ... (see create_unique)."""
+    ensure_dir(directory)
+    n = 0
+    while True:
+        path = directory / (base if n == 0 else f"{base}-{n}")
+        try:
+            path.mkdir()
+            return path
+        except FileExistsError:
+            n += 1
+
+@dataclass
+class BackupResult:
+    path: Path
+    strategies: Dict[str, int] = field(default_factory=dict)  # strategy name -> files copied with it
+    bytes: int = 0  # size of the files backed up
+
+    def describe(self) -> str:
+        return ", ".join(f"{n} {name}" for name, n in sorted(self.strategies.items())) or "nothing copied"
+
+def _reflink(src: Path, dst: Path) -> None:
+    if fcntl is None or not sys.platform.startswith("linux"):
+        raise OSError("reflink not supported here")
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        fcntl.ioctl(fd.fileno(), _FICLONE, fs.fileno())
+
+def _hardlink(src: Path, dst: Path) -> None:
+    # link under a temp name and rename, so a reserved (empty) dst is replaced too
+    tmp = dst.with_name(f"{dst.name}.thanos-link")
+    os.link(src, tmp)
+    os.replace(tmp, dst)
+
+def _kernel_copy(src: Path, dst: Path, use_sendfile: bool) -> None:
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        offset = 0
+        while True:
+            if use_sendfile:
+                sent = os.sendfile(fd.fileno(), fs.fileno(), offset, _KERNEL_CHUNK)
+            else:
+                sent = os.copy_file_range(fs.fileno(), fd.fileno(), _KERNEL_CHUNK)
+            if sent == 0:
+                break
+            offset += sent
+
+def _copy_file_range(src: Path, dst: Path) -> None:
+    if not hasattr(os, "copy_file_range"):
+        raise OSError("copy_file_range not available")
+    _kernel_copy(src, dst, use_sendfile=False)
+
+def _sendfile(src: Path, dst: Path) -> None:
+    if not sys.platform.startswith("linux"):  # file-to-file sendfile is Linux-only
+        raise OSError("sendfile not supported here")
+    _kernel_copy(src, dst, use_sendfile=True)
+
+# fastest first; "hardlink" only runs when the caller allows it
+_STRATEGIES = [
+    ("reflink", _reflink),
+    ("hardlink", _hardlink),
+    ("copy_file_range", _copy_file_range),
+    ("sendfile", _sendfile),
+]
+
+def copy_fast(src: Path, dst: Path, allow_hardlink: bool = False, skip: Optional[set] = None) -> str:
+    """
+    Copies src to dst with the cheapest strategy that works and returns its name:
+    reflink, hardlink, copy_file_range, sendfile, or "copy" (shutil.copy2) as the last resort.
+
+    A hardlink shares the inode with the source, so it is only a backup while nobody edits
+    the source in place: pass allow_hardlink only for files about to be moved to Trash.
+    `skip` collects strategies that failed, so a batch stops retrying them.
+    """
+    skip = set() if skip is None else skip
+    for name, fn in _STRATEGIES:
+        if name in skip:
+            continue
+        # another link to the file could still edit the shared inode in place
+        if name == "hardlink" and (not allow_hardlink or os.stat(src).st_nlink != 1):
+            continue
+        try:
+            fn(src, dst)
+        except OSError:
+            # the next strategy truncates whatever a failed one left in dst
+            skip.add(name)
+            continue
+        if name != "hardlink":
+            shutil.copystat(src, dst)
+        return name
     shutil.copy2(src, dst)
+    return "copy"
+
+def _reserve_backup_path(src: Path, backup_dir: Path) -> Path:
+    # same-named documents from different folders can be backed up within the same second
+    f, dst = create_unique(backup_dir, f"{src.stem}.THANOS_BACKUP_{stamp()}", src.suffix)
+    f.close()
     return dst
 
-def backup_folder_files(files: list[Path], backup_dir: Path) -> Path:
+def backup_file(src: Path, backup_dir: Path, allow_hardlink: bool = False) -> BackupResult:
+    ensure_dir(backup_dir)
+    dst = _reserve_backup_path(src, backup_dir)
+    strategy = copy_fast(src, dst, allow_hardlink)
+    return BackupResult(path=dst, strategies={strategy: 1}, bytes=os.stat(dst).st_size)
+
+def backup_folder_files(files: list[Path], backup_dir: Path, root: Optional[Path] = None,
+                        allow_hardlink: bool = False, cancel=None) -> BackupResult:
     """
     Copies the CURRENT versions of the files (only those involved in the snap)
-    into a timestamped backup folder.
+    into a timestamped backup folder. With `root`, each file keeps its path relative
+    to it, so same-named files from different subfolders don't overwrite each other.
     """
-    snap_dir = backup_dir / f"THANOS_FOLDER_BACKUP_{stamp()}"
-    ensure_dir(snap_dir)
+    snap_dir = create_unique_dir(backup_dir, f"THANOS_FOLDER_BACKUP_{stamp()}")
+    made = {snap_dir}
+    used: Counter = Counter()
+    skip: set = set()
+    size = 0
     for f in files:
-        # preserve basename; if collisions occur, you can improve with subdirs later
-        shutil.copy2(f, snap_dir / f.name)
-    return snap_dir
+        check_cancel(cancel)
+        dst = snap_dir / (f.relative_to(root) if root is not None else f.name)
+        if dst.parent not in made:
+            ensure_dir(dst.parent)
+            made.add(dst.parent)
+        used[copy_fast(f, dst, allow_hardlink, skip)] += 1
+        size += os.stat(dst).st_size
+    return BackupResult(path=snap_dir, strategies=dict(used), bytes=size)
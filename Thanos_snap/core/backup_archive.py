@@ -0,0 +1,68 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+import gzip
+import io
+import json
+import os
+import tarfile
+import threading
+
+from core.backup import create_unique
+from core.backup_stream import StreamingBackup
+from core.utils import stamp
+
+# gzip level 1: text/CSV/JSON still shrink several-fold at close to disk speed
+COMPRESS_LEVEL = 1
+
+# first member of every archive: where the files came from
+ARCHIVE_INFO_NAME = ".thanos_archive.json"
+
+class ArchiveBackup(StreamingBackup):
+    """
+    Streams files into one <backup_dir>/THANOS_ARCHIVE_<stamp>.tar.gz on a background thread.
+
+    flushed() yields each file once its bytes are compressed, written and fsync'ed, so the
+    caller can delete it while later files are still being archived. A gzip'ed tar is used
+    rather than a zip because a partly written one (crash, full disk) is still readable up
+    to the last flush.
+    """
+    def __init__(self, files: list[Path], backup_dir: Path, root: Optional[Path] = None,
+                 kind: str = "folder", cancel: Optional[threading.Event] = None):
+        super().__init__(files, root, cancel)
+        self.kind = kind
+        # several archives can be started within the same second
+        self._raw, self.path = create_unique(backup_dir, f"THANOS_ARCHIVE_{stamp()}", ".tar.gz")
+
+    def _arcname(self, f: Path) -> str:
+        return (f.relative_to(self.root) if self.root is not None else Path(f.name)).as_posix()
+
+    @contextmanager
+    def _open(self) -> Iterator[None]:
+        with self._raw as raw, \
+                gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=COMPRESS_LEVEL) as gz, \
+                tarfile.open(fileobj=gz, mode="w") as tar:
+            self._gz, self._tar = gz, tar
+            info = json.dumps({"kind": self.kind, "root": str(self.root) if self.root else None}).encode()
+            member = tarfile.TarInfo(ARCHIVE_INFO_NAME)
+            member.size = len(info)
+            tar.addfile(member, io.BytesIO(info))
+            yield
+
+    def _backup_one(self, f: Path) -> Optional[int]:
+        try:
+            member = self._tar.gettarinfo(str(f), arcname=self._arcname(f))
+            fh = open(f, "rb")
+        except OSError:
+            return None
+        # a failure once the member header is out would corrupt the archive: let it be fatal
+        with fh:
+            self._tar.addfile(member, fh)
+        self._used["archived"] += 1
+        return member.size
+
+    def _sync(self) -> None:
+        self._gz.flush()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
@@ -0,0 +1,87 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional
+import json
+import os
+import threading
+
+from core.backup import copy_fast, create_unique, create_unique_dir, ensure_dir
+from core.backup_store import BackupStore, manifest_entry
+from core.backup_stream import StreamingBackup, fsync_path
+from core.utils import stamp
+
+class PipelinedBackup(StreamingBackup):
+    """
+    Backs files up as plain copies (a THANOS_FOLDER_BACKUP_<stamp> mirror) or into the
+    deduplicating store, handing each file back once its copy (and the directory entry
+    naming it) is fsync'ed; see StreamingBackup.
+
+    A store backup appends each batch to manifests/<stamp>.partial.jsonl before releasing
+    it, so files already trashed stay restorable even if the snap dies before the manifest.
+    """
+    def __init__(self, files: list[Path], backup_dir: Path, root: Optional[Path] = None,
+                 mode: str = "copies", cancel: Optional[threading.Event] = None):
+        super().__init__(files, root, cancel)
+        self.mode = mode
+        self._skip: set = set()
+        self._to_sync: dict[Path, None] = {}  # new files and the directories naming them
+        if mode == "store":
+            self._store = BackupStore(backup_dir)
+            base = stamp()
+            self._journal, self.path = create_unique(self._store.manifests, base, ".partial.jsonl", "x")
+            self._journal.write(json.dumps({"kind": "folder", "created": base,
+                                            "root": str(root) if root else None}) + "\n")
+            self._entries: list[dict] = []      # this batch's manifest lines
+            self._all_entries: list[dict] = []
+        else:
+            self.path = create_unique_dir(backup_dir, f"THANOS_FOLDER_BACKUP_{stamp()}")
+            self._made = {self.path}
+
+    def _open(self):
+        return self._journal if self.mode == "store" else super()._open()
+
+    def _backup_one(self, f: Path) -> Optional[int]:
+        dst = None
+        try:
+            st = os.stat(f)
+            if self.mode == "store":
+                digest, strategy = self._store.put(f, self._skip)
+                self._entries.append(manifest_entry(f, st, digest, self.root))
+                if strategy != "dedup":
+                    blob = self._store.blob_path(digest)
+                    self._to_sync[blob] = self._to_sync[blob.parent] = None
+            else:
+                dst = self.path / (f.relative_to(self.root) if self.root is not None else f.name)
+                if dst.parent not in self._made:
+                    ensure_dir(dst.parent)
+                    self._made.add(dst.parent)
+                # hardlinks are safe here: trashed files are moved, never edited in place
+                strategy = copy_fast(f, dst, allow_hardlink=True, skip=self._skip)
+                if strategy != "hardlink":  # a hardlink's data is the trashed file's own
+                    self._to_sync[dst] = None
+                self._to_sync[dst.parent] = None
+        except OSError:
+            if dst is not None:
+                dst.unlink(missing_ok=True)
+            return None
+        self._used[strategy] += 1
+        return st.st_size
+
+    def _sync(self) -> None:
+        for p in self._to_sync:
+            fsync_path(p)
+        self._to_sync.clear()
+        if self.mode == "store" and self._entries:
+            self._journal.write("".join(json.dumps(e) + "\n" for e in self._entries))
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._all_entries.extend(self._entries)
+            self._entries.clear()
+
+    def _complete(self) -> None:
+        if self.mode == "store":
+            # the full manifest replaces the journal; should writing it fail, the journal still
+            # lists every file released
+            journal = self.path
+            self.path = self._store.write_manifest("folder", self.root, self._all_entries)
+            journal.unlink(missing_ok=True)
@@ -0,0 +1,122 @@
+from __future__ import annotations
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+import hashlib
+import json
+import os
+import uuid
+
+from core.backup import BackupResult, copy_fast, create_unique, ensure_dir
+from core.utils import check_cancel, stamp
+
+STORE_DIRNAME = "THANOS_STORE"
+
+# read size while hashing
+_HASH_CHUNK = 1 << 20
+
+def hash_file(path: Path) -> str:
+    h = hashlib.sha256()
+    buf = bytearray(_HASH_CHUNK)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+class BackupStore:
+    """
+    Content-addressed, deduplicating backup store under <backup_dir>/THANOS_STORE:
+      objects/<2 hex>/<rest of sha256>  one immutable blob per distinct content
+      manifests/<stamp>.json            one per snap: which file had which blob
+    A file whose content is already stored costs one hashing pass and no writes.
+    """
+    def __init__(self, backup_dir: Path):
+        self.root = backup_dir / STORE_DIRNAME
+        self.objects = self.root / "objects"
+        self.manifests = self.root / "manifests"
+
+    def blob_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    def put(self, src: Path, skip: Optional[set] = None) -> tuple[str, str]:
+        """Stores src's content; returns (sha256, strategy), strategy "dedup" if already present."""
+        before = os.stat(src)
+        digest = hash_file(src)
+        dst = self.blob_path(digest)
+        if dst.exists():
+            return digest, "dedup"
+
+        ensure_dir(dst.parent)
+        tmp = dst.with_name(f"{dst.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            # blobs are shared between snaps, so never hardlink them to a live file
+            strategy = copy_fast(src, tmp, allow_hardlink=False, skip=skip)
+            after = os.stat(src)
+            if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+                # src changed while we read it: key the blob by what was actually copied
+                digest = hash_file(tmp)
+                dst = self.blob_path(digest)
+                if dst.exists():
+                    tmp.unlink()
+                    return digest, "dedup"
+                ensure_dir(dst.parent)
+            os.replace(tmp, dst)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return digest, strategy
+
+    def write_manifest(self, kind: str, root: Optional[Path], entries: list[dict]) -> Path:
+        base = stamp()
+        f, path = create_unique(self.manifests, base, ".json", "x")
+        with f:
+            f.write(json.dumps({"kind": kind, "created": base, "root": str(root) if root else None,
+                                "files": entries}, indent=1))
+        return path
+
+def read_manifest(path: Path) -> dict:
+    """
+    A manifest, or the journal (<stamp>.partial.jsonl) of a pipelined backup that never
+    finished: a header line, then one line per file backed up before its file was trashed.
+    """
+    if path.name.endswith(".partial.jsonl"):
+        with open(path, encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            files = []
+            for line in f:
+                try:
+                    files.append(json.loads(line))
+                except ValueError:
+                    break  # torn last line: its batch was never released
+        return {**header, "files": files}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def manifest_entry(f: Path, st: os.stat_result, digest: str, root: Optional[Path] = None) -> dict:
+    """One file's line in a manifest; `st` is its stat from before it was stored."""
+    return {"path": (f.relative_to(root) if root is not None else f.resolve()).as_posix(),
+            "sha256": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "mode": st.st_mode & 0o7777}
+
+def store_backup(files: list[Path], backup_dir: Path, root: Optional[Path] = None,
+                 kind: str = "folder", cancel=None) -> BackupResult:
+    """
+    Backs the files up into the deduplicating store and writes the snap's manifest.
+    Paths are recorded relative to `root` when given, absolute otherwise.
+    BackupResult.path is the manifest; strategies counts "dedup" for blobs already stored.
+    """
+    store = BackupStore(backup_dir)
+    used: Counter = Counter()
+    skip: set = set()
+    entries = []
+    size = 0
+    for f in files:
+        check_cancel(cancel)
+        st = os.stat(f)
+        digest, strategy = store.put(f, skip)
+        used[strategy] += 1
+        size += st.st_size
+        entries.append(manifest_entry(f, st, digest, root))
+    return BackupResult(path=store.write_manifest(kind, root, entries), strategies=dict(used), bytes=size)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+import os
+import queue
+import threading
+
+from core.backup import BackupResult
+
+# backed-up files are released to the caller (e.g. for trashing) in fsync'ed batches
+SYNC_EVERY_FILES = 256
+SYNC_EVERY_BYTES = 64 << 20
+
+# files released but not yet taken by the caller before the backup waits for it
+QUEUE_FILES = 4 * SYNC_EVERY_FILES
+
+def fsync_path(path: Path) -> None:
+    """fsyncs a file or directory, best effort: directories can't be fsync'ed on Windows."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class StreamingBackup(ABC):
+    """
+    Backs files up on a background thread and hands each one back through flushed() once
+    its backup is durable, so the caller can delete it while later files are still being
+    backed up. At most QUEUE_FILES wait in between; if the caller stops taking them, the
+    backup stops too.
+
+    Subclasses provide the backup itself: _open() (a context around the whole run),
+    _backup_one(), _sync() and _complete().
+    """
+    def __init__(self, files: list[Path], root: Optional[Path] = None,
+                 cancel: Optional[threading.Event] = None):
+        self.files = files
+        self.root = root
+        self.cancel = cancel
+        self.path: Path  # set by the subclass
+        self.failed: list[Path] = []  # files that could not be backed up (the caller keeps them)
+        self.done = 0                 # files backed up
+        self.done_bytes = 0
+        self.released: list[Path] = []  # files handed to the caller by flushed()
+        self.error: Optional[BaseException] = None
+        self._used: Counter = Counter()
+        self._out: queue.Queue = queue.Queue(maxsize=QUEUE_FILES)
+        self._abandoned = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"thanos-{type(self).__name__}", daemon=True)
+
+    # -- for subclasses --
+    @contextmanager
+    def _open(self) -> Iterator[None]:
+        yield
+
+    @abstractmethod
+    def _backup_one(self, f: Path) -> Optional[int]:
+        """Backs `f` up; returns its size, or None if it could not be read (kept). Raising is fatal."""
+
+    def _sync(self) -> None:
+        """Makes everything backed up so far durable."""
+
+    def _complete(self) -> None:
+        """After the last file, once _open() has exited cleanly."""
+
+    # -- the pipeline --
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _stopped(self) -> bool:
+        return self._abandoned.is_set() or (self.cancel is not None and self.cancel.is_set())
+
+    def _put(self, item) -> bool:
+        # blocks while the caller is QUEUE_FILES behind; False once it has gone away
+        while not self._abandoned.is_set():
+            try:
+                self._out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _flush(self, pending: list[Path]) -> bool:
+        self._sync()
+        batch = list(pending)
+        pending.clear()
+        for p in batch:
+            if self._stopped() or not self._put(p):
+                return False
+        return True
+
+    def _run(self) -> None:
+        try:
+            with self._open():
+                pending: list[Path] = []  # backed up, not yet durable
+                pending_bytes = 0
+                for f in self.files:
+                    if self._stopped():
+                        break
+                    size = self._backup_one(f)
+                    if size is None:
+                        self.failed.append(f)
+                        continue
+                    self.done += 1
+                    self.done_bytes += size
+                    pending.append(f)
+                    pending_bytes += size
+                    if len(pending) >= SYNC_EVERY_FILES or pending_bytes >= SYNC_EVERY_BYTES:
+                        if not self._flush(pending):
+                            break
+                        pending_bytes = 0
+                self._flush(pending)
+            self._complete()
+        except BaseException as e:  # reported by finish(); files already released stay backed up
+            self.error = e
+        finally:
+            self._put(None)
+
+    def flushed(self) -> Iterator[Path]:
+        """Yields files as soon as their backup is durable."""
+        try:
+            while True:
+                p = self._out.get()
+                if p is None:
+                    return
+                self.released.append(p)
+                yield p
+        finally:
+            self._abandoned.set()  # done, or stopped early (cancel, error): never wait for us again
+
+    def finish(self) -> BackupResult:
+        """Waits for the backup to be complete; re-raises a fatal backup error."""
+        if not self._abandoned.is_set():
+            # nobody is taking the files (e.g. a document's backup): back them all up anyway
+            while self._out.get() is not None:
+                pass
+            self._abandoned.set()
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return BackupResult(path=self.path, strategies=dict(self._used), bytes=self.done_bytes)
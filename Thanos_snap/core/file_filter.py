@@ -0,0 +1,134 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+import fnmatch
+import os
+import re
+import time
+
+# Which files a folder snap may pick, beyond the extension list: name globs, a name regex,
+# size and age bounds. A filter is compiled once into a predicate on os.DirEntry that the
+# folder walk applies as it lists each directory, so excluded files are never collected;
+# only filters with size/age bounds cost a stat per file (cached on the entry).
+
+_SIZE_UNITS = {"": 1, "B": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+_AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+_BOUND = re.compile(r"^(size|age)\s*([<>])\s*(\d+(?:\.\d+)?|\.\d+)\s*([A-Za-z]*)$")
+_BOUND_START = re.compile(r"^(size|age)\s*[<>]")
+
+class FilterError(ValueError):
+    pass
+
+Match = Callable[[os.DirEntry], bool]
+
+@dataclass(frozen=True)
+class FileFilter:
+    """
+    A file matches when its name matches one of `globs` (any name if there are none),
+    `regex` is found in its name, and its size / age (from its mtime) is within bounds.
+    Bounds are exclusive; ages are in seconds.
+    """
+    globs: tuple[str, ...] = ()
+    regex: Optional[str] = None
+    min_size: Optional[int] = None
+    max_size: Optional[int] = None
+    min_age: Optional[float] = None
+    max_age: Optional[float] = None
+
+    @classmethod
+    def parse(cls, text: str) -> Optional["FileFilter"]:
+        """
+        Space-separated terms, all of which must hold, e.g. "size>100M age>30d *.log*":
+          size>N / size<N   bytes, with K M G T suffixes (binary)
+          age>N / age<N     older / newer than N s, m, h, d or w
+          re:PATTERN        regex searched in the file name
+          anything else     a glob on the file name (case-insensitive); several globs: any may match
+        Empty text: None (no filter).
+        """
+        globs: list[str] = []
+        fields: dict = {}
+        for term in text.split():
+            bound = _BOUND.match(term)
+            if bound:
+                what, op, num, unit = bound.groups()
+                try:
+                    value = float(num) * (_SIZE_UNITS[unit.upper()] if what == "size" else _AGE_UNITS[unit or "s"])
+                except KeyError:
+                    raise FilterError(f"unknown unit in {term!r}") from None
+                key = ("min_" if op == ">" else "max_") + what
+                fields[key] = int(value) if what == "size" else value
+            elif _BOUND_START.match(term):
+                raise FilterError(f"bad number in {term!r}")
+            elif term.startswith("re:"):
+                fields["regex"] = term[3:]
+            else:
+                globs.append(term)
+        if not globs and not fields:
+            return None
+        f = cls(globs=tuple(globs), **fields)
+        f.compile()  # reject bad regexes now rather than mid-scan
+        return f
+
+    @property
+    def needs_stat(self) -> bool:
+        return any(v is not None for v in (self.min_size, self.max_size, self.min_age, self.max_age))
+
+    def describe(self) -> str:
+        parts = list(self.globs)
+        if self.regex is not None:
+            parts.append(f"re:{self.regex}")
+        for key, label in (("min_size", "size>"), ("max_size", "size<")):
+            if getattr(self, key) is not None:
+                parts.append(f"{label}{getattr(self, key)}")
+        for key, label in (("min_age", "age>"), ("max_age", "age<")):
+            if getattr(self, key) is not None:
+                parts.append(f"{label}{getattr(self, key):.0f}s")
+        return " ".join(parts)
+
+    def compile(self, now: Optional[float] = None) -> Match:
+        """The predicate. Ages are measured from `now` (default: the time of the call)."""
+        try:
+            glob_re = re.compile("|".join(fnmatch.translate(g) for g in self.globs), re.IGNORECASE) \
+                if self.globs else None
+            name_re = re.compile(self.regex) if self.regex is not None else None
+        except re.error as e:
+            raise FilterError(f"bad pattern: {e}") from None
+        now = time.time() if now is None else now
+        lo_size, hi_size = self.min_size, self.max_size
+        # age bounds as mtime bounds: older than N -> mtime before now - N
+        hi_mtime = now - self.min_age if self.min_age is not None else None
+        lo_mtime = now - self.max_age if self.max_age is not None else None
+        stat_needed = self.needs_stat
+
+        def match(entry: os.DirEntry) -> bool:
+            name = entry.name
+            if glob_re is not None and not glob_re.match(name):
+                return False
+            if name_re is not None and not name_re.search(name):
+                return False
+            if stat_needed:
+                st = entry.stat(follow_symlinks=False)
+                if lo_size is not None and not st.st_size > lo_size:
+                    return False
+                if hi_size is not None and not st.st_size < hi_size:
+                    return False
+                if hi_mtime is not None and not st.st_mtime < hi_mtime:
+                    return False
+                if lo_mtime is not None and not st.st_mtime > lo_mtime:
+                    return False
+            return True
+        return match
+
+def compile_filter(allowed_exts: Optional[Sequence[str]], file_filter: Optional[FileFilter]) -> Optional[Match]:
+    """
+    One predicate for the extension list (a set lookup) and `file_filter`; None when both are
+    empty, so an unfiltered walk pays nothing per file.
+    """
+    exts = None if allowed_exts is None else frozenset(allowed_exts)
+    rest = None if file_filter is None else file_filter.compile()
+    splitext = os.path.splitext
+    if exts is None:
+        return rest
+    if rest is None:
+        return lambda entry: splitext(entry.name)[1].lower() in exts
+    return lambda entry: splitext(entry.name)[1].lower() in exts and rest(entry)
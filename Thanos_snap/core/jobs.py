@@ -0,0 +1,247 @@
+from __future__ import annotations
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Sequence
+import glob
+import os
+import time
+
+from core import snap_file, snap_folder
+from core.backup import BackupResult, backup_file
+from core.backup_archive import ArchiveBackup
+from core.backup_pipeline import PipelinedBackup
+from core.backup_store import store_backup
+from core.file_filter import FileFilter
+from core.metrics import SnapMetrics, describe, merge
+from core.restore import write_record
+from core.selection import Selector
+from core.utils import SnapPlan, fingerprint
+
+# Whole snaps of one target (backup + execution), shared by the GUI and the headless runner.
+# Results are plain dicts so they can be printed as JSON as-is; result["metrics"] has the
+# time spent in each phase (see core/metrics.py).
+
+BACKUP_MODES = ("copies", "store", "archive")
+
+# documents queued per process in a batch; each child streams its file, so this bounds memory
+DOCS_IN_FLIGHT_PER_WORKER = 2
+
+def _no_log(_msg: str) -> None:
+    pass
+
+def run_folder_snap(folder: Path, strength_percent: int, allowed_exts: Optional[Sequence[str]] = None,
+                    recursive: bool = False, plan: Optional[SnapPlan] = None,
+                    backup_dir: Optional[Path] = None, backup_mode: str = "copies", workers: int = 1,
+                    progress_cb=None, cancel=None, log: Callable[[str], None] = _no_log,
+                    streaming: bool = False, selector: Optional[Selector] = None,
+                    file_filter: Optional[FileFilter] = None) -> dict:
+    """
+    Plans (unless a current `plan` is given), backs up the chosen files into `backup_dir`
+    (None = no backup) and sends them to Trash.
+    `streaming`, `selector`, `file_filter`: see snap_folder.make_plan.
+    """
+    metrics = SnapMetrics("folder", str(folder))
+    if plan is not None and plan.matches(folder, "folder", strength_percent, allowed_exts, recursive, selector,
+                                         file_filter) and plan.is_current():
+        log("[Folder] Using the previewed plan.")
+    else:
+        plan = snap_folder.make_plan(folder, strength_percent, allowed_exts, recursive, streaming, selector, metrics,
+                                     file_filter)
+    # should execution have to re-plan, it does so with the recorded seed
+    selector = Selector.replaying(plan.seed)
+    log(f"[Folder] Plan: {plan.to_remove}/{plan.total} to Trash (seed: {plan.seed})")
+    result = {"kind": "folder", "target": str(folder), "candidates": plan.total,
+              "planned": plan.to_remove, "deleted": 0, "failed": 0, "backup": None, "seed": plan.seed}
+
+    # backup only the files chosen for deletion, keeping their paths relative to the folder
+    backup = backup_dir is not None and plan.to_remove > 0
+    if backup:
+        # each file is trashed as soon as its backup is durable, while later ones are backed up
+        log(f"[Folder] Backing up the {plan.to_remove} chosen files while snapping…")
+        if backup_mode == "archive":
+            pipe = ArchiveBackup(plan.selected, backup_dir, root=folder, cancel=cancel)
+        else:
+            pipe = PipelinedBackup(plan.selected, backup_dir, root=folder, mode=backup_mode, cancel=cancel)
+        # backing up and trashing overlap, so they are timed as one phase
+        with metrics.phase("backup+trash") as ph:
+            pipe.start()
+            result["deleted"], result["failed"] = snap_folder.trash_files(pipe.flushed(), plan.to_remove,
+                                                                           progress_cb, workers, cancel)
+            try:
+                res = pipe.finish()
+                result["backup"] = str(res.path)
+                log(f"[Folder] Backup created: {res.path} ({res.describe()})")
+            except Exception as e:
+                result["error"] = f"backup failed: {e}"
+                log(f"[Folder] Backup failed: {e}")
+                if pipe.released:
+                    # those files are in the Trash: the partial backup (journal, archive up to
+                    # its last flush, copies) is what restores them
+                    result["backup"] = str(pipe.path)
+                    log(f"[Folder] {result['deleted']} of the {plan.to_remove} planned files were backed up "
+                        f"and trashed before the failure (partial backup: {pipe.path}); the rest are kept.")
+                else:
+                    log("[Folder] Nothing was trashed.")
+            ph.files += pipe.done
+            ph.bytes_read += pipe.done_bytes
+            ph.bytes_written += pipe.path.stat().st_size if backup_mode == "archive" else pipe.done_bytes
+        if pipe.failed:
+            result["not_backed_up"] = len(pipe.failed)
+            log(f"[Folder] Could not back up (kept): {len(pipe.failed)}")
+    else:
+        result["deleted"], result["failed"] = snap_folder.execute(
+            folder, strength_percent, allowed_exts, progress_cb=progress_cb, plan=plan,
+            recursive=recursive, workers=workers, cancel=cancel, streaming=streaming, selector=selector,
+            metrics=metrics, file_filter=file_filter)
+
+    log(f"[Folder] Done. Deleted to Trash: {result['deleted']} | Failed: {result['failed']}")
+    if result["backup"] is not None:
+        result["record"] = str(write_record(backup_dir, {
+            "kind": "folder", "target": str(folder.resolve()), "backup_mode": backup_mode,
+            "backup": str(Path(result["backup"]).resolve()), "seed": plan.seed,
+            # only the files handed over for trashing: the others were never touched
+            "files": [f.relative_to(folder).as_posix() for f in pipe.released],
+            "deleted": result["deleted"], "failed": result["failed"],
+            **({"error": result["error"]} if "error" in result else {})}))
+    result["metrics"] = metrics.finish()
+    log(f"[Folder] Timing: {describe(result['metrics'])}")
+    return result
+
+def backup_document(doc: Path, backup_dir: Path, backup_mode: str = "copies", cancel=None) -> BackupResult:
+    if backup_mode == "store":
+        return store_backup([doc], backup_dir, kind="document", cancel=cancel)
+    if backup_mode == "archive":
+        return ArchiveBackup([doc], backup_dir, kind="document").start().finish()
+    # never hardlink: a mode that removes nothing, fails or is cancelled leaves the document
+    # in place, and logs are appended to in place
+    return backup_file(doc, backup_dir)
+
+def run_document_snap(doc: Path, strength_percent: int, modes: Sequence[str],
+                      plans: Optional[dict] = None, backup_dir: Optional[Path] = None,
+                      backup_mode: str = "copies", progress_cb=None, cancel=None,
+                      log: Callable[[str], None] = _no_log, selector: Optional[Selector] = None) -> dict:
+    """
+    Backs the document up once, then applies each mode ("lines" / "chars" / "bytes") in order.
+    `plans` maps a mode to a previewed plan; a plan made stale by an earlier mode is re-planned
+    with the same seed (`selector`, else the preview's). Each mode's seed is reported with its counts.
+    """
+    plans = plans or {}
+    if selector is None:
+        # modes re-planned after an earlier one repeat the preview's seed
+        previewed = [p for p in (plans.get(m) for m in modes) if p is not None and p.target == doc]
+        selector = Selector.replaying(previewed[0].seed) if previewed else Selector()
+    result = {"kind": "document", "target": str(doc), "backup": None}
+    metrics = SnapMetrics("document", str(doc))
+    if backup_dir is not None:
+        with metrics.phase("backup") as ph:
+            res = backup_document(doc, backup_dir, backup_mode, cancel)
+            ph.files += 1
+            ph.bytes_read += res.bytes
+            ph.bytes_written += res.bytes if backup_mode != "archive" else res.path.stat().st_size
+        result["backup"] = str(res.path)
+        log(f"[Doc] Backup created: {res.path} ({res.describe()})")
+
+    try:
+        for mode in modes:
+            plan = plans.get(mode)
+            if plan is None or not plan.matches(doc, mode, strength_percent, selector=selector) \
+                    or not plan.is_current():
+                plan = snap_file.make_plan(doc, strength_percent, mode, selector, metrics.section(mode))
+            removed, kept = snap_file.execute(doc, strength_percent, mode, progress_cb=progress_cb, plan=plan,
+                                              cancel=cancel, selector=Selector.replaying(plan.seed),
+                                              metrics=metrics.section(mode))
+            result[mode] = {"removed": removed, "kept": kept, "seed": plan.seed}
+            log(f"[Doc {mode.capitalize()}] Removed: {removed} | Kept: {kept} (seed: {plan.seed})")
+    finally:
+        # also after a failed mode: the modes before it did change the document
+        if result["backup"] is not None:
+            # "after" lets restore tell whether the document was edited since the snap
+            result["record"] = str(write_record(backup_dir, {
+                "kind": "document", "target": str(doc.resolve()), "backup_mode": backup_mode,
+                "backup": str(Path(result["backup"]).resolve()),
+                "modes": [m for m in modes if m in result], "after": list(fingerprint(doc))}))
+    result["metrics"] = metrics.finish()
+    log(f"[Doc] Timing: {describe(result['metrics'])}")
+    return result
+
+def expand_documents(specs: Iterable[str]) -> list[Path]:
+    """Paths and glob patterns ("**" recurses) -> existing files, sorted, without duplicates."""
+    found = set()
+    for spec in specs:
+        spec = os.path.expanduser(spec.strip())
+        if not spec:
+            continue
+        matches = glob.glob(spec, recursive=True) if glob.has_magic(spec) else [spec]
+        found.update(Path(m) for m in matches if os.path.isfile(m))
+    return sorted(found)
+
+def _snap_document_in_child(doc: Path, strength_percent: int, modes: Sequence[str],
+                            backup_dir: Optional[Path], backup_mode: str, selector: Selector) -> dict:
+    # runs in a pool process: report failures as data so one bad file doesn't end the batch
+    try:
+        return run_document_snap(doc, strength_percent, modes, backup_dir=backup_dir,
+                                 backup_mode=backup_mode, selector=selector)
+    except Exception as e:
+        return {"kind": "document", "target": str(doc), "error": f"{type(e).__name__}: {e}"}
+
+def run_documents_snap(docs: Sequence[Path], strength_percent: int, modes: Sequence[str],
+                       backup_dir: Optional[Path] = None, backup_mode: str = "copies",
+                       workers: Optional[int] = None, progress_cb=None, cancel=None,
+                       log: Callable[[str], None] = _no_log, selector: Optional[Selector] = None) -> dict:
+    """
+    Snaps many documents across a process pool, each with its own backup.
+    Only `workers` * DOCS_IN_FLIGHT_PER_WORKER documents are queued at a time. Cancelling
+    stops new submissions; documents already running finish (each rewrite is atomic).
+    Each document's selection is derived from the batch seed and its path.
+    Returns aggregated removed/kept totals per mode plus the failures.
+    """
+    # only batches need processes: keep multiprocessing out of startup
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    workers = workers or os.cpu_count() or 1
+    selector = selector or Selector()
+    started = time.perf_counter()
+    snaps: list[dict] = []
+    total = len(docs)
+    result = {"kind": "documents", "documents": total, "snapped": 0, "errors": [],
+              "totals": {m: {"removed": 0, "kept": 0} for m in modes}, "seed": selector.seed}
+    log(f"[Docs] Snapping {total} documents on {workers} processes (seed: {selector.seed})…")
+
+    def collect(rec: dict):
+        if "error" in rec:
+            result["errors"].append({"target": rec["target"], "error": rec["error"]})
+            log(f"[Docs] Failed: {rec['target']} ({rec['error']})")
+        else:
+            result["snapped"] += 1
+            snaps.append(rec["metrics"])
+            for m in modes:
+                result["totals"][m]["removed"] += rec[m]["removed"]
+                result["totals"][m]["kept"] += rec[m]["kept"]
+        if progress_cb:
+            progress_cb(result["snapped"] + len(result["errors"]), total)
+
+    # spawn, not fork: callers (GUI, headless runner) are multi-threaded, and a forked child
+    # can inherit a lock held by another thread and hang
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        in_flight = set()
+        for doc in docs:
+            if cancel is not None and cancel.is_set():
+                break
+            in_flight.add(pool.submit(_snap_document_in_child, doc, strength_percent, list(modes),
+                                      backup_dir, backup_mode, selector.derive(str(doc))))
+            if len(in_flight) >= workers * DOCS_IN_FLIGHT_PER_WORKER:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    collect(fut.result())
+        for fut in wait(in_flight).done:
+            collect(fut.result())
+
+    # phase times are summed over the documents (so can exceed the batch's wall time)
+    result["metrics"] = merge("documents", f"{total} documents", snaps, time.perf_counter() - started)
+    log(f"[Docs] Timing (phases summed over documents): {describe(result['metrics'])}")
+    for m in modes:
+        t = result["totals"][m]
+        log(f"[Docs {m.capitalize()}] Removed: {t['removed']} | Kept: {t['kept']} "
+            f"across {result['snapped']} documents")
+    return result
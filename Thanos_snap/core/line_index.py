@@ -0,0 +1,115 @@
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import BinaryIO, Optional
+import os
+import struct
+
+from core.utils import cache_path, write_cache
+
+# one newline count per block: 8 bytes per MB of document
+INDEX_BLOCK = 1 << 20
+
+# smaller documents are counted in well under a second and are not worth a cache file
+MIN_CACHED_SIZE = 8 << 20
+
+_MAGIC = b"THNLIDX1"
+_HEADER = struct.Struct("<8sQqQQ")  # magic, size, mtime_ns, total lines, block size
+
+class LineIndex:
+    """
+    Line-offset index of one version (size, mtime_ns) of a document.
+    `newlines[b]` is the number of b"\\n" before block b, so the start of any line is one
+    bisect plus a scan of at most one block away, and the line count needs no read at all.
+    """
+    def __init__(self, size: int, mtime_ns: int, total: int, newlines: array, block: int = INDEX_BLOCK):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.total = total
+        self.newlines = newlines
+        self.block = block
+        self.bytes_read = 0  # of the document, to build this index (0 when loaded from the cache)
+
+    @classmethod
+    def build(cls, path: Path) -> "LineIndex":
+        newlines = array("Q")
+        count = read = 0
+        last = b""
+        with open(path, "rb", buffering=0) as f:
+            st = os.fstat(f.fileno())
+            buf = bytearray(INDEX_BLOCK)
+            view = memoryview(buf)
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                newlines.append(count)
+                count += buf.count(b"\n", 0, n)
+                read += n
+                last = view[n - 1:n].tobytes()
+        # a last line without a trailing newline still counts
+        total = count + (1 if last and last != b"\n" else 0)
+        idx = cls(st.st_size, st.st_mtime_ns, total, newlines)
+        idx.bytes_read = read
+        return idx
+
+    def line_start(self, f: BinaryIO, i: int) -> int:
+        """Byte offset of line i (0-based), read through the open binary handle `f`."""
+        if i == 0:
+            return 0
+        b = bisect_left(self.newlines, i) - 1  # last block starting before the i-th newline
+        pos = b * self.block
+        need = i - self.newlines[b]
+        f.seek(pos)
+        while True:
+            chunk = f.read(self.block)
+            if not chunk:
+                raise IndexError(i)
+            n = chunk.count(b"\n")
+            if n >= need:
+                at = -1
+                for _ in range(need):
+                    at = chunk.find(b"\n", at + 1)
+                return pos + at + 1
+            need -= n
+            pos += len(chunk)
+
+    def read_line(self, f: BinaryIO, i: int, limit: int = 320) -> bytes:
+        """Up to `limit` bytes of line i, without its line ending."""
+        f.seek(self.line_start(f, i))
+        return f.readline(limit).rstrip(b"\r\n")
+
+def _cache_path(path: Path) -> Path:
+    return cache_path("line_index", str(path.resolve()))
+
+def _load(path: Path, size: int, mtime_ns: int) -> Optional[LineIndex]:
+    try:
+        with open(_cache_path(path), "rb") as f:
+            magic, isize, imtime, total, block = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC or (isize, imtime) != (size, mtime_ns):
+                return None  # the document changed since: stale
+            newlines = array("Q")
+            newlines.frombytes(f.read())
+    except (OSError, struct.error, ValueError):
+        return None
+    return LineIndex(isize, imtime, total, newlines, block)
+
+def _save(path: Path, idx: LineIndex) -> None:
+    def write(f):
+        f.write(_HEADER.pack(_MAGIC, idx.size, idx.mtime_ns, idx.total, idx.block))
+        f.write(idx.newlines.tobytes())
+    write_cache(_cache_path(path), write)
+
+def get(path: Path) -> LineIndex:
+    """
+    The document's line index: from the cache while its size and mtime are unchanged,
+    otherwise rebuilt (one counting pass) and cached again.
+    """
+    st = os.stat(path)
+    idx = _load(path, st.st_size, st.st_mtime_ns)
+    if idx is None:
+        idx = LineIndex.build(path)
+        if idx.size >= MIN_CACHED_SIZE:
+            _save(path, idx)
+    return idx
@@ -0,0 +1,73 @@
+from __future__ import annotations
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+import threading
+
+# lines kept in the on-screen log; older ones are only in the spill file
+MAX_VIEW_LINES = 5000
+
+# session log files kept in the spill directory
+KEEP_SPILL_FILES = 20
+
+class LogSink:
+    """
+    Thread-safe buffer between log producers (Tk thread, snap worker) and the log view.
+
+    write() costs the same whatever has been logged before: the line goes into a bounded
+    ring of pending lines and, when `spill_path` is set, to that file (buffered). The view
+    calls drain() once per UI tick and inserts the batch in one go, keeping at most
+    `max_lines`. If more than `max_lines` arrive within one tick, only the newest reach the
+    view; the spill file always has every line.
+    """
+    def __init__(self, max_lines: int = MAX_VIEW_LINES, spill_path: Optional[Path] = None):
+        self.max_lines = max_lines
+        self.spill_path = spill_path
+        self._pending: deque[str] = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._spill = None
+
+    def write(self, msg: str) -> None:
+        line = f"[{datetime.now():%H:%M:%S}] {msg}\n"
+        with self._lock:
+            self._pending.append(line)
+            if self.spill_path is not None:
+                self._spill_write(line)
+
+    def _spill_write(self, line: str) -> None:
+        try:
+            if self._spill is None:
+                self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+                self._spill = open(self.spill_path, "a", encoding="utf-8", errors="replace",
+                                   buffering=1 << 16)
+            self._spill.write(line)
+        except OSError:
+            self.spill_path = None  # keep logging to the view without the file
+
+    def drain(self) -> list[str]:
+        """Takes every pending line (oldest first) and flushes the spill file."""
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+            if self._spill is not None:
+                try:
+                    self._spill.flush()
+                except OSError:
+                    pass
+        return lines
+
+    def close(self) -> None:
+        with self._lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+def prune_spill_files(folder: Path, keep: int = KEEP_SPILL_FILES) -> None:
+    """Deletes all but the newest `keep` session logs (names sort by their timestamp)."""
+    try:
+        logs = sorted(folder.glob("session_*.log"))
+    except OSError:
+        return
+    for old in logs[:-keep] if keep else logs:
+        old.unlink(missing_ok=True)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+import json
+import threading
+import time
+
+# Per-phase timings of one snap (scan, sample, backup, trash, write, ...). Engines take an
+# optional `metrics` and record into it; jobs attach the result to every snap's result
+# dict as result["metrics"], which the GUI logs and the headless runner can save as JSON lines.
+
+@dataclass
+class Phase:
+    name: str
+    seconds: float = 0.0
+    files: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0  # logical bytes: hardlinks, reflinks and dedup write less
+
+    def to_dict(self) -> dict:
+        d = {"phase": self.name, "seconds": round(self.seconds, 4), "files": self.files,
+             "bytes_read": self.bytes_read, "bytes_written": self.bytes_written}
+        if self.seconds > 0:
+            if self.files:
+                d["files_s"] = round(self.files / self.seconds, 1)
+            if self.bytes_read or self.bytes_written:
+                d["mb_s"] = round(max(self.bytes_read, self.bytes_written) / (1 << 20) / self.seconds, 1)
+        return d
+
+class SnapMetrics:
+    """
+    Phases of one snap, in the order they first ran. Timing the same phase again adds to it.
+    section("lines") gives a view that records under "lines.<phase>" into the same snap.
+    """
+    def __init__(self, kind: str, target: str):
+        self.kind = kind
+        self.target = target
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self._t0 = time.perf_counter()
+        self.seconds: Optional[float] = None
+        self.phases: dict[str, Phase] = {}
+        self._prefix = ""
+
+    def section(self, prefix: str) -> "SnapMetrics":
+        view = object.__new__(SnapMetrics)
+        view.__dict__.update(self.__dict__)  # shares the phases dict
+        view._prefix = f"{self._prefix}{prefix}."
+        return view
+
+    def get(self, name: str) -> Phase:
+        name = self._prefix + name
+        if name not in self.phases:
+            self.phases[name] = Phase(name)
+        return self.phases[name]
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[Phase]:
+        ph = self.get(name)
+        t0 = time.perf_counter()
+        try:
+            yield ph
+        finally:
+            ph.seconds += time.perf_counter() - t0
+
+    def finish(self) -> dict:
+        self.seconds = time.perf_counter() - self._t0
+        return self.to_dict()
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "target": self.target, "started": self.started,
+                "seconds": round(self.seconds if self.seconds is not None else time.perf_counter() - self._t0, 4),
+                "phases": [p.to_dict() for p in self.phases.values()]}
+
+@contextmanager
+def timed(metrics: Optional[SnapMetrics], name: str) -> Iterator[Phase]:
+    """metrics.phase(name), or a throwaway Phase when nobody is measuring."""
+    if metrics is None:
+        yield Phase(name)
+    else:
+        with metrics.phase(name) as ph:
+            yield ph
+
+def merge(kind: str, target: str, snaps: Iterable[dict], seconds: float) -> dict:
+    """Sums the phases of several snaps' metrics (e.g. a document batch); `seconds` is the batch's wall time."""
+    phases: dict[str, Phase] = {}
+    for m in snaps:
+        for d in m["phases"]:
+            ph = phases.setdefault(d["phase"], Phase(d["phase"]))
+            ph.seconds += d["seconds"]
+            ph.files += d["files"]
+            ph.bytes_read += d["bytes_read"]
+            ph.bytes_written += d["bytes_written"]
+    return {"kind": kind, "target": target, "started": None, "seconds": round(seconds, 4),
+            "phases": [p.to_dict() for p in phases.values()]}
+
+def describe(m: dict) -> str:
+    """One log line: total time, then each phase's share and throughput."""
+    parts = []
+    for p in m["phases"]:
+        rate = f" {p['mb_s']} MB/s" if "mb_s" in p else f" {p['files_s']} files/s" if "files_s" in p else ""
+        parts.append(f"{p['phase']} {p['seconds']:.2f}s{rate}")
+    return f"{m['seconds']:.2f}s: " + (", ".join(parts) or "nothing timed")
+
+_write_lock = threading.Lock()
+
+def write_jsonl(path: Path, m: dict) -> None:
+    """Appends one metrics record to a JSON-lines file (safe to call from several threads)."""
+    line = json.dumps(m) + "\n"
+    with _write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
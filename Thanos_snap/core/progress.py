@@ -0,0 +1,17 @@
+from __future__ import annotations
+from typing import Optional, Tuple
+
+class ProgressSlot:
+    """
+    Latest-value progress mailbox, usable as a progress_cb.
+    The engine overwrites it from its worker thread and the UI polls it at its own frame
+    rate, so neither side ever waits on the other and no event queue builds up.
+    """
+    def __init__(self):
+        self.value: Optional[Tuple[int, int]] = None
+
+    def __call__(self, i: int, total: int) -> None:
+        self.value = (i, total)  # a single assignment: atomic under the GIL
+
+    def reset(self) -> None:
+        self.value = None
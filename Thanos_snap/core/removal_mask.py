@@ -0,0 +1,104 @@
+from __future__ import annotations
+from typing import Optional
+
+from core.selection import Selector, optional_numpy
+
+# byte value -> 8 keep-selectors (1 = keep), least significant bit first
+_KEEP_BYTES = [bytes(0 if (b >> j) & 1 else 1 for j in range(8)) for b in range(256)]
+
+# positions handled per vectorized step when numpy is available
+SAMPLE_CHUNK = 1 << 22
+
+# Generator.hypergeometric takes fewer good and bad items than this (1 GB documents have more)
+_NUMPY_HYPERGEOMETRIC_MAX = 10 ** 9
+
+def _hypergeometric(gen, ngood: int, nbad: int, nsample: int) -> int:
+    if ngood < _NUMPY_HYPERGEOMETRIC_MAX and nbad < _NUMPY_HYPERGEOMETRIC_MAX:
+        return int(gen.hypergeometric(ngood, nbad, nsample))
+    # the legacy sampler has no such limit; it draws from the same (seeded) bit generator
+    legacy = optional_numpy().random.RandomState(gen.bit_generator)
+    return int(legacy.hypergeometric(ngood, nbad, nsample))
+
+class RemovalMask:
+    """
+    Compact removal mask: one bit per position (line or character), a set bit means "remove".
+    A 200M-position mask costs 25 MB, instead of a set of millions of Python ints.
+    """
+    def __init__(self, total: int):
+        self.total = total
+        self.bits = bytearray((total + 7) // 8)
+
+    @classmethod
+    def sample(cls, total: int, k: int, selector: Optional[Selector] = None) -> "RemovalMask":
+        """Uniformly marks exactly `k` of `total` positions for removal."""
+        selector = selector or Selector()
+        mask = cls(total)
+        k = max(0, min(k, total))
+        if k == 0:
+            return mask
+        if optional_numpy() is not None:
+            mask._sample_numpy(k, selector.numpy())
+        else:
+            mask._sample_floyd(k, selector.generator())
+        return mask
+
+    def _sample_floyd(self, k: int, rng) -> None:
+        # Floyd's algorithm with the bitmap itself as the "already picked" set;
+        # when more than half is removed, pick the survivors and invert instead
+        total = self.total
+        invert = k > total // 2
+        picks = total - k if invert else k
+        bits = self.bits
+        for j in range(total - picks, total):
+            t = rng.randrange(j + 1)
+            if bits[t >> 3] & (1 << (t & 7)):
+                t = j
+            bits[t >> 3] |= 1 << (t & 7)
+        if invert:
+            self._invert()
+
+    def _sample_numpy(self, k: int, gen) -> None:
+        # walk the positions chunk by chunk: the number of removals falling in a chunk is
+        # hypergeometric, then that many distinct offsets are chosen inside the chunk
+        np = optional_numpy()
+        remaining_total, remaining_k = self.total, k
+        for start in range(0, self.total, SAMPLE_CHUNK):
+            size = min(SAMPLE_CHUNK, self.total - start)
+            if remaining_k == 0:
+                break
+            if size == remaining_total:
+                m = remaining_k
+            else:
+                m = _hypergeometric(gen, size, remaining_total - size, remaining_k)
+            if m:
+                chunk = np.zeros(size, dtype=bool)
+                chunk[gen.choice(size, m, replace=False)] = True
+                packed = np.packbits(chunk, bitorder="little")
+                self.bits[start // 8:start // 8 + len(packed)] = packed.tobytes()
+            remaining_total -= size
+            remaining_k -= m
+
+    def _invert(self) -> None:
+        self.bits = bytearray(self.bits.translate(bytes(255 - b for b in range(256))))
+        tail = self.total % 8
+        if tail:
+            self.bits[-1] &= (1 << tail) - 1
+
+    def __contains__(self, i: int) -> bool:
+        return bool(self.bits[i >> 3] & (1 << (i & 7)))
+
+    def count(self) -> int:
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def keep_selectors(self, start: int, stop: int) -> bytes:
+        """One byte per position in [start, stop): 1 = keep, 0 = remove (for itertools.compress)."""
+        lo = start % 8
+        raw = b"".join(map(_KEEP_BYTES.__getitem__, self.bits[start // 8:(stop + 7) // 8]))
+        return raw[lo:lo + (stop - start)]
+
+    def keep_array(self, start: int, stop: int):
+        """numpy boolean keep-mask for positions [start, stop)."""
+        np = optional_numpy()
+        lo = start % 8
+        raw = np.frombuffer(bytes(self.bits[start // 8:(stop + 7) // 8]), dtype=np.uint8)
+        return ~np.unpackbits(raw, bitorder="little")[lo:lo + (stop - start)].astype(bool)
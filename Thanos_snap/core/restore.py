@@ -0,0 +1,301 @@
+from __future__ import annotations
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+import json
+import os
+import tarfile
+import threading
+import uuid
+import zlib
+
+from core.backup import copy_fast, create_unique, ensure_dir
+from core.backup_archive import ARCHIVE_INFO_NAME
+from core.backup_store import BackupStore, hash_file, read_manifest
+from core.utils import check_cancel, fingerprint, stamp
+
+# one record per snap with a backup: what was snapped and where its backup is
+RECORDS_DIRNAME = "THANOS_RECORDS"
+
+# files restored concurrently (copy/reflink calls release the GIL)
+RESTORE_WORKERS = 8
+
+# what reading an archive cut short (a crash or full disk during the snap) raises at the cut
+_TRUNCATED = (EOFError, tarfile.ReadError, zlib.error)
+
+# -- snap records --
+
+def write_record(backup_dir: Path, record: dict) -> Path:
+    """Saves a snap record as <backup_dir>/THANOS_RECORDS/<kind>_<stamp>.json."""
+    f, path = create_unique(backup_dir / RECORDS_DIRNAME, f"{record['kind']}_{stamp()}", ".json", "x")
+    with f:
+        f.write(json.dumps({"created": stamp(), **record}, indent=1))
+    return path
+
+def list_records(backup_dir: Path) -> list[Path]:
+    """Snap records in the backup directory, oldest first."""
+    folder = backup_dir / RECORDS_DIRNAME
+    if not folder.is_dir():
+        return []
+    return sorted(folder.glob("*.json"), key=lambda p: (p.stat().st_mtime_ns, p.name))
+
+def load_record(path: Path) -> dict:
+    """
+    A snap record, or one rebuilt from a self-describing backup: a store manifest
+    (THANOS_STORE/manifests/*.json, or the *.partial.jsonl journal of an interrupted
+    snap) or a THANOS_ARCHIVE_*.tar.gz.
+    """
+    if path.name.endswith(".tar.gz"):
+        info, names = None, []
+        try:
+            with tarfile.open(path, "r|gz") as tar:
+                for m in tar:
+                    if m.name == ARCHIVE_INFO_NAME:
+                        info = json.load(tar.extractfile(m))
+                    elif m.isfile():
+                        names.append(m.name)
+        except _TRUNCATED:
+            pass  # cut short by a crash or full disk: the members before the cut are listed
+        if info is None:
+            raise ValueError(f"not a snap archive, or too damaged to read: {path}")
+        if info["kind"] == "document":
+            raise ValueError("a document archive does not say where the document was: use its snap record")
+        return {"kind": "folder", "target": info["root"], "backup_mode": "archive",
+                "backup": str(path), "files": names}
+    data = read_manifest(path) if path.parent.name == "manifests" else json.loads(path.read_text(encoding="utf-8"))
+    if "backup_mode" in data:
+        return data
+    if "files" in data and path.parent.name == "manifests":
+        files = [e["path"] for e in data["files"]]
+        if data["kind"] == "document":
+            return {"kind": "document", "target": files[0], "backup_mode": "store", "backup": str(path)}
+        return {"kind": "folder", "target": data["root"], "backup_mode": "store", "backup": str(path),
+                "files": files}
+    raise ValueError(f"not a snap record or backup manifest: {path}")
+
+# -- restore --
+
+@dataclass
+class _Item:
+    name: str                      # as recorded: relative to the folder, or the document's name
+    dst: Path
+    src: Optional[Path] = None     # file to copy from; None for archive members
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+    mode: Optional[int] = None
+    mtime_ns: Optional[int] = None
+
+def _items(record: dict) -> list[_Item]:
+    backup = Path(record["backup"])
+    mode = record["backup_mode"]
+    if record["kind"] == "document":
+        pairs = [(Path(record["target"]).name, Path(record["target"]))]
+    else:
+        root = Path(record["target"])
+        pairs = [(name, root / name) for name in record["files"]]
+
+    if mode == "store":
+        manifest = read_manifest(backup)
+        store = BackupStore(backup.parents[2])  # <backup_dir>/THANOS_STORE/manifests/<x>.json
+        entries = {Path(e["path"]).name if record["kind"] == "document" else e["path"]: e
+                   for e in manifest["files"]}
+        return [_Item(name, dst, store.blob_path(e["sha256"]), e["size"], e["sha256"], e["mode"], e["mtime_ns"])
+                for name, dst in pairs if (e := entries.get(name)) is not None]
+    if mode == "archive":
+        return [_Item(name, dst) for name, dst in pairs]
+    # plain copies: a mirror folder, or the document's single backup file
+    if record["kind"] == "document":
+        return [_Item(name, dst, backup) for name, dst in pairs]
+    return [_Item(name, dst, backup / name) for name, dst in pairs]
+
+def _conflict(item: _Item, record: dict) -> Optional[str]:
+    """Why restoring `item` would overwrite something the snap did not leave there (None: safe)."""
+    try:
+        now = fingerprint(item.dst)
+    except FileNotFoundError:
+        return None
+    if record["kind"] == "document":
+        after = record.get("after")
+        return None if after is not None and list(now) == list(after) else "document changed since the snap"
+    return "a file exists at this path"
+
+def _unchanged(item: _Item) -> bool:
+    # the file is back already (restored before, or never removed)
+    try:
+        st = os.stat(item.dst)
+        src = os.stat(item.src) if item.src is not None else None
+    except OSError:
+        return False
+    size = item.size if item.size is not None else (src.st_size if src else None)
+    mtime = item.mtime_ns if item.mtime_ns is not None else (src.st_mtime_ns if src else None)
+    return size is not None and (st.st_size, st.st_mtime_ns) == (size, mtime)
+
+def _temp_for(dst: Path) -> Path:
+    return dst.with_name(f".{dst.name}.{uuid.uuid4().hex}.thanos-restore")
+
+def _install(item: _Item, tmp: Path, expected_size: int, verify_hash: bool) -> None:
+    """Checks the restored temp file, then renames it over the destination in one step."""
+    if item.mode is not None:
+        os.chmod(tmp, item.mode)
+    if item.mtime_ns is not None:
+        os.utime(tmp, ns=(item.mtime_ns, item.mtime_ns))
+    if os.stat(tmp).st_size != expected_size:
+        raise OSError(f"size mismatch after restore: {item.name}")
+    if verify_hash:
+        want = item.sha256 or (hash_file(item.src) if item.src is not None else None)
+        if want is not None and hash_file(tmp) != want:
+            raise OSError(f"checksum mismatch after restore: {item.name}")
+    os.replace(tmp, item.dst)
+
+def _restore_copy(item: _Item, skip: set, verify_hash: bool) -> str:
+    ensure_dir(item.dst.parent)
+    tmp = _temp_for(item.dst)
+    try:
+        # never hardlink: the restored file must not share an inode with the backup
+        strategy = copy_fast(item.src, tmp, allow_hardlink=False, skip=skip)
+        _install(item, tmp, item.size if item.size is not None else os.stat(item.src).st_size, verify_hash)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return strategy
+
+def _restore_archive(record: dict, items: list[_Item], present: dict[str, _Item], verify_hash: bool,
+                     cancel, tick) -> None:
+    # a gzip stream can only be read front to back: members are restored in one pass.
+    # `present`: files already in the folder, back if they match their archived size and mtime
+    wanted = {item.name: item for item in items}
+    try:
+        with tarfile.open(record["backup"], "r|gz") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                if (item := present.pop(member.name, None)) is not None:
+                    st = os.stat(item.dst)
+                    same = (st.st_size, int(st.st_mtime)) == (member.size, int(member.mtime))
+                    tick(item, "unchanged" if same else "conflict")
+                    continue
+                item = wanted.pop(member.name, None)
+                if item is None:
+                    continue
+                check_cancel(cancel)
+                ensure_dir(item.dst.parent)
+                tmp = _temp_for(item.dst)
+                try:
+                    with tar.extractfile(member) as src, open(tmp, "wb") as out:
+                        while chunk := src.read(1 << 20):
+                            out.write(chunk)
+                    item.mode = member.mode
+                    item.mtime_ns = int(member.mtime) * 1_000_000_000
+                    _install(item, tmp, member.size, verify_hash)
+                except _TRUNCATED:
+                    tmp.unlink(missing_ok=True)
+                    wanted[item.name] = item  # cut off mid-file: missing, like the members after it
+                    raise
+                except OSError as e:
+                    tmp.unlink(missing_ok=True)
+                    tick(item, "failed", str(e))
+                    continue
+                tick(item, "archive")
+    except _TRUNCATED:
+        pass  # the archive ends early (crash, full disk): the members it still has are restored
+    for item in wanted.values():
+        tick(item, "missing")
+    for item in present.values():
+        tick(item, "conflict")
+
+def restore(record: dict, workers: int = RESTORE_WORKERS, overwrite: bool = False,
+            verify_hash: bool = False, dry_run: bool = False, progress_cb=None, cancel=None) -> dict:
+    """
+    Puts back what a snap removed, from its backup.
+    Folder snaps: every recorded file missing from the folder is restored, `workers` at a
+    time; files already back are counted as unchanged, other files in the way are conflicts.
+    Document snaps: the document is replaced if it is still as the snap left it (or with
+    `overwrite`). Each file is restored to a temp name, checked (size; sha256 with
+    `verify_hash`), and renamed into place, so a failure never leaves half a file.
+    """
+    items = _items(record)
+    archive = record["backup_mode"] == "archive"
+    result = {"kind": record["kind"], "target": record["target"], "backup": record["backup"],
+              "files": len(items), "restored": 0, "unchanged": 0, "conflicts": [], "missing": [],
+              "failed": [], "strategies": {}}
+    todo: list[_Item] = []
+    present: dict[str, _Item] = {}  # archive members to compare once the archive is read
+    for item in items:
+        reason = _conflict(item, record)
+        if reason is None or overwrite:
+            todo.append(item)
+        elif record["kind"] == "folder" and archive:
+            present[item.name] = item
+        elif record["kind"] == "folder" and _unchanged(item):
+            result["unchanged"] += 1
+        else:
+            result["conflicts"].append({"path": str(item.dst), "reason": reason})
+    if not archive:
+        for item in [i for i in todo if not i.src.is_file()]:
+            result["missing"].append(str(item.dst))
+            todo.remove(item)
+    if dry_run:
+        result["would_restore"] = len(todo)
+        if present:
+            result["to_compare"] = len(present)
+        return result
+
+    lock = threading.Lock()
+    used: Counter = Counter()
+    done = 0
+
+    def tick(item: _Item, outcome: str, error: Optional[str] = None):
+        # outcome: a copy strategy, or "unchanged" / "conflict" / "missing" / "failed"
+        nonlocal done
+        with lock:
+            if outcome == "unchanged":
+                result["unchanged"] += 1
+                return
+            if outcome == "conflict":
+                result["conflicts"].append({"path": str(item.dst), "reason": "a different file exists here"})
+                return
+            done += 1
+            if outcome == "missing":
+                result["missing"].append(str(item.dst))
+            elif outcome == "failed":
+                result["failed"].append({"path": str(item.dst), "error": error})
+            else:
+                result["restored"] += 1
+                used[outcome] += 1
+            if progress_cb:
+                progress_cb(done, len(todo))
+
+    if archive:
+        _restore_archive(record, todo, present, verify_hash, cancel, tick)
+    else:
+        skip: set = set()
+
+        def one(item: _Item):
+            if cancel is not None and cancel.is_set():
+                return
+            try:
+                tick(item, _restore_copy(item, skip, verify_hash))
+            except OSError as e:
+                tick(item, "failed", str(e))
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(one, todo))
+        check_cancel(cancel)
+    result["strategies"] = dict(used)
+    return result
+
+def latest_record(backup_dir: Path, target: Optional[Path] = None) -> Optional[Path]:
+    """The newest snap record (of `target`, when given)."""
+    for path in reversed(list_records(backup_dir)):
+        if target is None or Path(load_record(path)["target"]) == target.resolve():
+            return path
+    return None
+
+def summarize(paths: Iterable[Path]) -> Iterable[dict]:
+    """One line per record, for listings."""
+    for p in paths:
+        r = load_record(p)
+        yield {"record": str(p), "created": r.get("created"), "kind": r["kind"], "target": r["target"],
+               "backup_mode": r["backup_mode"], "files": len(r.get("files", [])) or 1}
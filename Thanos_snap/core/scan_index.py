@@ -0,0 +1,126 @@
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+import marshal
+import threading
+import time
+
+from core.utils import cache_path, dirs_unchanged, write_cache
+
+# Folder listings kept between scans, one index file per folder under cache_dir()/scan_index.
+# A directory whose mtime is unchanged still has the same entries (adding, removing or
+# renaming an entry moves it), so its cached listing is reused without reading it again;
+# only changed subtrees are listed. File sizes and mtimes are NOT taken from the index:
+# editing a file in place doesn't touch its directory, so size/age filters stat afresh.
+
+_FORMAT = 1
+
+# a directory modified this close to the scan may change again within the same mtime tick
+# (coarse timestamps on FAT, SMB, ...): it is listed again next time rather than trusted
+RACY_NS = 2_000_000_000
+
+# indexes kept in memory, so repeated previews of the same folder don't even load the file
+MEMORY_SLOTS = 4
+
+# whole-walk results remembered per index (one per filter tried)
+REMEMBERED_RESULTS = 4
+
+class ScanIndex:
+    """
+    Listings of one folder tree: directory (relative to the root, "" for the root) ->
+    (mtime_ns, file names, subdirectory names). Symlinks are never listed.
+    Hold `lock` from begin() to finish(): one walk at a time.
+    """
+    def __init__(self, root: Path, dirs: Optional[dict] = None):
+        self.root = root
+        self.dirs: dict[str, tuple[int, tuple[str, ...], tuple[str, ...]]] = dirs or {}
+        self.dirty = False
+        self.lock = threading.Lock()
+        self._seen: set[str] = set()
+        self._started_ns = 0
+        self._prefix = str(root)
+        self._cut = 0
+        # last result per filter: (memo key, directory stamps, files)
+        self._results: dict = {}
+
+    def begin(self, walked_root: str) -> None:
+        """Starts a walk; its paths all start with `walked_root` (the folder as the caller gave it)."""
+        self._seen = set()
+        self._started_ns = time.time_ns()
+        self._prefix = walked_root
+        self._cut = len(walked_root.rstrip("/\\")) + 1
+
+    def _key(self, path: str) -> str:
+        return "" if path == self._prefix else path[self._cut:]
+
+    def lookup(self, path: str, mtime_ns: int) -> Optional[tuple[tuple[str, ...], tuple[str, ...]]]:
+        """The cached (files, subdirs) names of `path` if it still has this mtime."""
+        key = self._key(path)
+        self._seen.add(key)
+        hit = self.dirs.get(key)
+        if hit is None or mtime_ns < 0 or hit[0] != mtime_ns:
+            return None
+        return hit[1], hit[2]
+
+    def store(self, path: str, mtime_ns: int, files: tuple[str, ...], subdirs: tuple[str, ...]) -> None:
+        if mtime_ns >= self._started_ns - RACY_NS:
+            mtime_ns = -1
+        self.dirs[self._key(path)] = (mtime_ns, files, subdirs)
+        self.dirty = True
+
+    def finish(self, recursive: bool) -> None:
+        """After a walk: forgets directories a recursive walk no longer reached, saves if changed."""
+        if recursive and self._seen != self.dirs.keys():
+            for gone in self.dirs.keys() - self._seen:
+                del self.dirs[gone]
+            self.dirty = True
+        if self.dirty:
+            _save(self)
+            self.dirty = False
+
+    # -- whole-walk results --
+    def remembered(self, memo_key) -> Optional[tuple[list[str], tuple]]:
+        """The last walk's result for this filter while none of its directories changed."""
+        hit = self._results.get(memo_key)
+        if hit is None or not dirs_unchanged(hit[1]):
+            return None
+        # racy directories are stamped -1 in the index: the result can't be trusted either
+        if any(self.dirs.get(self._key(d), (-1,))[0] < 0 for d, _ in hit[1]):
+            return None
+        return list(hit[0]), hit[1]
+
+    def remember(self, memo_key, files: list[str], stamps: tuple) -> None:
+        self._results.pop(memo_key, None)
+        self._results[memo_key] = (list(files), stamps)
+        while len(self._results) > REMEMBERED_RESULTS:
+            del self._results[next(iter(self._results))]
+
+def _cache_path(root: Path) -> Path:
+    return cache_path("scan_index", str(root))
+
+def _load(root: Path) -> ScanIndex:
+    try:
+        with open(_cache_path(root), "rb") as f:
+            fmt, stored_root, dirs = marshal.load(f)
+        if fmt == _FORMAT and stored_root == str(root):
+            return ScanIndex(root, dirs)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    return ScanIndex(root)
+
+def _save(index: ScanIndex) -> None:
+    write_cache(_cache_path(index.root), lambda f: marshal.dump((_FORMAT, str(index.root), index.dirs), f))
+
+_open: OrderedDict[Path, ScanIndex] = OrderedDict()
+_lock = threading.Lock()
+
+def get(folder: Path) -> ScanIndex:
+    """The folder's index: from memory, else from its file, else empty."""
+    root = folder.resolve()
+    with _lock:
+        index = _open.pop(root, None) or _load(root)
+        _open[root] = index
+        while len(_open) > MEMORY_SLOTS:
+            _open.popitem(last=False)
+    return index
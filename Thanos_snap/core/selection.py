@@ -0,0 +1,82 @@
+from __future__ import annotations
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Sequence, TypeVar
+import os
+import random
+
+T = TypeVar("T")
+
+# below this many candidates random.sample beats the numpy round trip
+NUMPY_SAMPLE_MIN = 1 << 16
+
+@lru_cache(maxsize=None)
+def optional_numpy():
+    """numpy, imported on first use (it costs ~0.1 s); None when not installed."""
+    try:
+        import numpy
+    except ImportError:  # optional: the pure-Python paths are used instead
+        return None
+    return numpy
+
+def new_seed() -> int:
+    return int.from_bytes(os.urandom(8), "little")
+
+class Selector:
+    """
+    The one source of randomness for a snap's selection.
+
+    By default a fast seeded generator (Mersenne Twister, or numpy's PCG64 for large
+    samples) is used and `seed` is recorded in plans and results: the same seed on the
+    same target (and the same numpy availability) picks the same files, lines or bytes again.
+    Every pick starts from the seed afresh, so re-planning with one selector repeats itself.
+    secure=True draws every pick from the OS (SystemRandom) instead; such snaps have no
+    seed and cannot be reproduced.
+    """
+    def __init__(self, seed: Optional[int] = None, secure: bool = False):
+        self.secure = secure
+        self.seed = None if secure else (new_seed() if seed is None else int(seed))
+
+    @classmethod
+    def replaying(cls, seed: Optional[int]) -> "Selector":
+        """Selector that repeats a recorded seed (None: the pick was made with OS randomness)."""
+        return cls(seed, secure=seed is None)
+
+    def generator(self) -> random.Random:
+        return random.SystemRandom() if self.secure else random.Random(self.seed)
+
+    def derive(self, label: str) -> "Selector":
+        """Independent, still reproducible selector for one item of a batch (e.g. a document)."""
+        if self.secure:
+            return Selector(secure=True)
+        return Selector(random.Random(f"{self.seed}:{label}").getrandbits(64))
+
+    def numpy(self):
+        """numpy Generator seeded from this selector (the OS when secure)."""
+        return optional_numpy().random.default_rng(random.SystemRandom().getrandbits(128) if self.secure else self.seed)
+
+    def sample(self, items: Sequence[T], k: int) -> List[T]:
+        """Uniformly random k of `items` (all of them if k >= len(items))."""
+        n = len(items)
+        if k <= 0:
+            return []
+        if k >= n:
+            return list(items)
+        if n >= NUMPY_SAMPLE_MIN and optional_numpy() is not None:
+            return [items[i] for i in self.numpy().choice(n, k, replace=False).tolist()]
+        return self.generator().sample(items, k)
+
+    def stream(self, items: Iterable[T], total: int, k: int) -> Iterator[T]:
+        """
+        Selection sampling (Knuth's Algorithm S): yields a uniformly random k of a stream of
+        `total` items, in stream order, keeping nothing but two counters. Stops reading as
+        soon as k items are chosen; items past `total` are never chosen.
+        """
+        randrange = self.generator().randrange
+        seen = 0
+        for item in items:
+            if k <= 0 or seen >= total:
+                return
+            if randrange(total - seen) < k:
+                k -= 1
+                yield item
+            seen += 1
@@ -1,75 +1,212 @@
 from __future__ import annotations
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Literal
-from core.utils import SnapPlan, unbiased_sample
-import random
+from typing import Iterator, Literal, Optional
+from core.metrics import SnapMetrics, timed
+from core.utils import SnapPlan, check_cancel, fingerprint
+from core.backup_stream import fsync_path
+from core.removal_mask import RemovalMask
+from core.selection import Selector, optional_numpy
+from core import line_index
+from itertools import compress
+import mmap
+import os
+import shutil
+import tempfile
 
-_rng = random.SystemRandom()
+# lines: remove whole lines, bytes kept as-is | chars: decoded characters | bytes: raw bytes
+Mode = Literal["lines", "chars", "bytes"]
 
-Mode = Literal["lines", "chars"]
+# characters decoded (chars mode) / bytes filtered (bytes mode) per step
+CHAR_CHUNK = 1 << 20
 
-def make_plan(file_path: Path, strength_percent: int, mode: Mode) -> SnapPlan:
-    data = file_path.read_text(encoding="utf-8", errors="replace")
+# lines mode reports progress and checks for cancellation every this many lines
+LINE_STEP = 4096
 
-    if mode == "lines":
-        lines = data.splitlines(keepends=True)
-        total = len(lines)
-        to_remove = (total * strength_percent) // 100
-        idxs = list(range(total))
-        chosen = set(_rng.sample(idxs, to_remove)) if to_remove > 0 else set()
-        preview = []
-        # preview first few removed lines (trimmed)
-        for i in sorted(list(chosen))[:10]:
-            preview.append(lines[i].strip()[:80])
-        return SnapPlan(total=total, to_remove=to_remove, targets_preview=preview)
-
-    # chars mode
-    total = len(data)
-    to_remove = (total * strength_percent) // 100
-    return SnapPlan(total=total, to_remove=to_remove, targets_preview=["(character-level removal preview omitted)"])
+# removed lines shown by a lines-mode preview, picked from across the whole file
+PREVIEW_LINES = 10
+
+def _open_text(file_path: Path):
+    # newline="" keeps the original line endings intact on the way back out
+    return file_path.open("r", encoding="utf-8", errors="replace", newline="")
+
+@contextmanager
+def _mapped(file_path: Path):
+    """Read-only mmap of the whole file (b"" for an empty one, which cannot be mapped)."""
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+def _line_spans(buf) -> Iterator[tuple[int, int]]:
+    # a line runs up to and including b"\n" ("\r\n" endings stay inside the line)
+    pos, size = 0, len(buf)
+    while pos < size:
+        nl = buf.find(b"\n", pos)
+        end = size if nl < 0 else nl + 1
+        yield pos, end
+        pos = end
+
+def _preview_lines(file_path: Path, index: line_index.LineIndex, mask: RemovalMask, to_remove: int,
+                   selector: Selector) -> list[str]:
+    # rejection-sample removed line numbers (at least ~10% of lines are removed, so few tries),
+    # then read each one with a seek through the line index
+    rng = selector.derive("preview").generator()
+    want = min(PREVIEW_LINES, to_remove)
+    picks: set[int] = set()
+    for _ in range(100 * want):
+        if len(picks) == want:
+            break
+        i = rng.randrange(mask.total)
+        if i in mask:
+            picks.add(i)
+    with open(file_path, "rb") as f:
+        return [f"{i + 1}: {index.read_line(f, i).decode('utf-8', 'replace').strip()[:80]}"
+                for i in sorted(picks)]
 
-def execute(file_path: Path, strength_percent: int, mode: Mode, progress_cb=None) -> tuple[int, int]:
+def _iter_chunks(f, size: int = CHAR_CHUNK) -> Iterator[str]:
+    return iter(lambda: f.read(size), "")
+
+def _count_chars(file_path: Path) -> int:
+    with _open_text(file_path) as f:
+        return sum(len(chunk) for chunk in _iter_chunks(f))
+
+@contextmanager
+def _atomic_rewrite(file_path: Path, binary: bool = False):
     """
-    Permanently edits the file content (not sent to trash).
-    Returns: (removed_count, kept_count)
+    Yields a text (or binary) handle to a temp file in the same directory; on success it
+    replaces `file_path` with a single rename, on failure the original file is left untouched.
+    The new contents are fsync'ed before the rename and the rename after it, so a crash
+    leaves either version, never a truncated one.
     """
-    data = file_path.read_text(encoding="utf-8", errors="replace")
+    fd, tmp = tempfile.mkstemp(prefix=f".{file_path.name}.", suffix=".thanos-tmp", dir=file_path.parent)
+    tmp_path = Path(tmp)
+    try:
+        with (os.fdopen(fd, "wb") if binary else
+              os.fdopen(fd, "w", encoding="utf-8", errors="replace", newline="")) as out:
+            yield out
+            out.flush()
+            os.fsync(out.fileno())
+        shutil.copymode(file_path, tmp_path)
+        os.replace(tmp_path, file_path)
+        fsync_path(file_path.parent)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+def make_plan(file_path: Path, strength_percent: int, mode: Mode,
+              selector: Optional[Selector] = None, metrics: Optional[SnapMetrics] = None) -> SnapPlan:
+    """metrics: records "scan" (counting units), "sample" and, for lines, "preview"."""
+    selector = selector or Selector()
+    fp = fingerprint(file_path)
+    with timed(metrics, "scan") as ph:
+        if mode == "lines":
+            index = line_index.get(file_path)
+            total = index.total
+            ph.bytes_read += index.bytes_read
+        elif mode == "bytes":
+            total = fp[0]
+        else:
+            total = _count_chars(file_path)
+            ph.bytes_read += fp[0]
+        ph.files += 1
+    to_remove = (total * strength_percent) // 100
+    with timed(metrics, "sample"):
+        mask = RemovalMask.sample(total, to_remove, selector)
 
     if mode == "lines":
-        lines = data.splitlines(keepends=True)
-        total = len(lines)
-        to_remove = (total * strength_percent) // 100
-        if total == 0 or to_remove <= 0:
-            return 0, total
-
-        idxs = list(range(total))
-        delete_set = set(_rng.sample(idxs, to_remove))
-
-        kept = []
-        for i, line in enumerate(lines):
-            if i not in delete_set:
-                kept.append(line)
+        with timed(metrics, "preview"):
+            preview = _preview_lines(file_path, index, mask, to_remove, selector) if to_remove > 0 else []
+    elif mode == "bytes":
+        preview = ["(byte-level removal preview omitted)"]
+    else:
+        preview = ["(character-level removal preview omitted)"]
+
+    return SnapPlan(total=total, to_remove=to_remove, targets_preview=preview,
+                    target=file_path, mode=mode, strength_percent=strength_percent,
+                    mask=mask, fingerprint=fp, seed=selector.seed)
+
+def _rewrite_lines(file_path: Path, mask: RemovalMask, progress_cb=None, cancel=None) -> None:
+    # no decoding: each run of kept lines is written straight from the mapping, so the
+    # survivors stay byte-identical and memory stays flat whatever the file size.
+    # The mapping is closed (inner with) before the temp file is renamed over the original.
+    total = mask.total
+    with _atomic_rewrite(file_path, binary=True) as out, _mapped(file_path) as mm, memoryview(mm) as mv:
+        run = 0  # start of the current stretch of kept lines
+        for i, (start, end) in enumerate(_line_spans(mm)):
+            if i in mask:
+                if start > run:
+                    out.write(mv[run:start])
+                run = end
+            if i % LINE_STEP == 0:
+                check_cancel(cancel)
+                if progress_cb:
+                    progress_cb(i + 1, total)
+        out.write(mv[run:])
+    if progress_cb:
+        progress_cb(total, total)
+
+def _filter_chunk(chunk: str, mask: RemovalMask, start: int) -> str:
+    stop = start + len(chunk)
+    np = optional_numpy()
+    if np is not None:
+        # vectorized: code points as uint32, boolean-indexed, then decoded back
+        cps = np.frombuffer(chunk.encode("utf-32-le"), dtype=np.uint32)
+        return cps[mask.keep_array(start, stop)].tobytes().decode("utf-32-le")
+    return "".join(compress(chunk, mask.keep_selectors(start, stop)))
+
+def _rewrite_chars(file_path: Path, mask: RemovalMask, progress_cb=None, cancel=None) -> None:
+    total = mask.total
+    pos = 0
+    with _open_text(file_path) as src, _atomic_rewrite(file_path) as out:
+        for chunk in _iter_chunks(src):
+            check_cancel(cancel)
+            out.write(_filter_chunk(chunk, mask, pos))
+            pos += len(chunk)
             if progress_cb:
-                progress_cb(i + 1, total)
+                progress_cb(pos, total)
 
-        new_data = "".join(kept)
-        file_path.write_text(new_data, encoding="utf-8", errors="replace")
-        return to_remove, total - to_remove
+def _rewrite_bytes(file_path: Path, mask: RemovalMask, progress_cb=None, cancel=None) -> None:
+    total = mask.total
+    np = optional_numpy()
+    with _atomic_rewrite(file_path, binary=True) as out, _mapped(file_path) as mm, memoryview(mm) as mv:
+        for start in range(0, total, CHAR_CHUNK):
+            check_cancel(cancel)
+            stop = min(start + CHAR_CHUNK, total)
+            if np is not None:
+                out.write(np.frombuffer(mv[start:stop], dtype=np.uint8)[mask.keep_array(start, stop)].tobytes())
+            else:
+                out.write(bytes(compress(mv[start:stop], mask.keep_selectors(start, stop))))
+            if progress_cb:
+                progress_cb(stop, total)
 
-    # chars mode
-    total = len(data)
-    to_remove = (total * strength_percent) // 100
-    if total == 0 or to_remove <= 0:
-        return 0, total
-
-    delete_positions = set(_rng.sample(range(total), to_remove))
-    out_chars = []
-    for i, ch in enumerate(data):
-        if i not in delete_positions:
-            out_chars.append(ch)
-        if progress_cb and (i % 2000 == 0):
-            progress_cb(i + 1, total)
-
-    new_data = "".join(out_chars)
-    file_path.write_text(new_data, encoding="utf-8", errors="replace")
-    return to_remove, total - to_remove
+def execute(file_path: Path, strength_percent: int, mode: Mode, progress_cb=None,
+            plan: Optional[SnapPlan] = None, cancel=None, selector: Optional[Selector] = None,
+            metrics: Optional[SnapMetrics] = None) -> tuple[int, int]:
+    """
+    Permanently edits the file content (not sent to trash).
+    A matching, still-current `plan` is executed as-is; otherwise the file is planned afresh
+    (with `selector`'s seed when given).
+    Setting the `cancel` event raises SnapCancelled and leaves the file untouched.
+    metrics: the rewrite is recorded as "write" (plus make_plan's phases on a re-plan).
+    Returns: (removed_count, kept_count)
+    """
+    if (plan is None or not plan.matches(file_path, mode, strength_percent, selector=selector)
+            or not plan.is_current()):
+        plan = make_plan(file_path, strength_percent, mode, selector, metrics)
+    if plan.total == 0 or plan.to_remove <= 0:
+        return 0, plan.total
+
+    with timed(metrics, "write") as ph:
+        if mode == "lines":
+            _rewrite_lines(file_path, plan.mask, progress_cb, cancel)
+        elif mode == "bytes":
+            _rewrite_bytes(file_path, plan.mask, progress_cb, cancel)
+        else:
+            _rewrite_chars(file_path, plan.mask, progress_cb, cancel)
+        ph.files += 1
+        ph.bytes_read += plan.fingerprint[0]
+        ph.bytes_written += os.stat(file_path).st_size
+    return plan.to_remove, plan.total - plan.to_remove
@@ -1,58 +1,363 @@
 from __future__ import annotations
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Sequence
+from typing import Iterable, Iterator, Optional, Sequence
 import os
+import threading
 
-from send2trash import send2trash
+from core.file_filter import FileFilter, Match, compile_filter
+from core.metrics import SnapMetrics, timed
+from core import scan_index
+from core.selection import Selector
+from core.utils import SnapPlan, exts_key
 
-from core.utils import SnapPlan, unbiased_sample
+# directories listed concurrently by a recursive scan (I/O bound, so more than the core count)
+SCAN_WORKERS = 16
 
-def list_candidate_files(folder: Path, allowed_exts: Optional[Sequence[str]]) -> list[Path]:
+# listings a recursive scan keeps in flight per worker ahead of the directory it yields
+SCAN_LOOKAHEAD = 4
+
+# trash requests queued per worker; bounds memory and how much a cancel leaves in flight
+TRASH_QUEUE_PER_WORKER = 2
+
+def _entries(path: str, match: Optional[Match], subdirs: Optional[list]) -> Iterator[str]:
+    """
+    Yields the candidate files of one directory with os.scandir, using the DirEntry's
+    cached type info instead of a stat per entry (`match` stats only for size/age bounds).
+    Subdirectories go to `subdirs` (None: skipped).
+    """
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_symlink():
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if subdirs is not None:
+                        subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    if match is None or match(entry):
+                        yield entry.path
+            except OSError:
+                continue
+
+class _IndexedEntry:
+    """The part of os.DirEntry a filter uses, for a name taken from the scan index."""
+    __slots__ = ("name", "path")
+
+    def __init__(self, folder: str, name: str):
+        self.name = name
+        self.path = os.path.join(folder, name)
+
+    def stat(self, follow_symlinks: bool = False) -> os.stat_result:
+        return os.stat(self.path, follow_symlinks=follow_symlinks)
+
+def _list_entries(path: str) -> tuple[list[os.DirEntry], tuple[str, ...]]:
+    """One directory's files (as DirEntry, so a filter's stat is cached) and subdirectory names; symlinks skipped."""
+    files: list[os.DirEntry] = []
+    subdirs: list[str] = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_symlink():
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file(follow_symlinks=False):
+                    files.append(entry)
+            except OSError:
+                continue
+    return files, tuple(subdirs)
+
+def _matching(entries: Iterable, match: Match) -> list[str]:
+    # like _entries: a file gone or unreadable by the time it is checked is skipped
+    out = []
+    for e in entries:
+        try:
+            if match(e):
+                out.append(e.path)
+        except OSError:
+            continue
+    return out
+
+def _dir_mtime(path: str) -> int:
+    # taken before listing, so a change during it is caught later
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+def _scan_dir(path: str, match: Optional[Match], recursive: bool, index: Optional[scan_index.ScanIndex] = None):
+    """Lists one directory (from `index` while it is unchanged). Returns (files, subdirs, mtime_ns)."""
+    files: list[str] = []
+    subdirs: list[str] = []
+    mtime_ns = _dir_mtime(path)
+    if index is not None:
+        join = os.path.join
+        listing = index.lookup(path, mtime_ns)
+        if listing is None:
+            try:
+                entries, subnames = _list_entries(path)
+            except OSError:
+                return files, subdirs, -1
+            index.store(path, mtime_ns, tuple(e.name for e in entries), subnames)
+            files = [e.path for e in entries] if match is None else _matching(entries, match)
+        else:
+            names, subnames = listing
+            if match is None:
+                files = [join(path, n) for n in names]
+            else:
+                files = _matching((_IndexedEntry(path, n) for n in names), match)
+        if recursive:
+            subdirs = [join(path, n) for n in subnames]
+        return files, subdirs, mtime_ns
+    try:
+        files.extend(_entries(path, match, subdirs if recursive else None))
+    except OSError:
+        mtime_ns = -1
+    return files, subdirs, mtime_ns
+
+def _iter_files(folder: Path, match: Optional[Match], recursive: bool,
+                stamps: list, workers: Optional[int] = None, index: Optional[scan_index.ScanIndex] = None) -> Iterator[str]:
+    """
+    Yields candidate files as directories are listed and appends (dir, mtime_ns) to `stamps`
+    for every directory scanned. The order is fixed, so a streaming pick is reproducible:
+    recursive scans go breadth-first, subdirectories and each directory's files sorted by
+    name; a flat scan keeps the directory's own order (stable while it is unchanged).
+    Without an `index`, a flat scan streams straight from scandir and never holds the listing.
+    """
+    if not recursive and index is not None:
+        fs, _, mtime_ns = _scan_dir(str(folder), match, False, index)
+        stamps.append((str(folder), mtime_ns))
+        yield from fs
+        return
+    if not recursive:
+        stamps.append((str(folder), _dir_mtime(str(folder))))
+        try:
+            yield from _entries(str(folder), match, None)
+        except OSError:
+            stamps[-1] = (str(folder), -1)
+        return
+
+    # directories are listed concurrently, up to SCAN_LOOKAHEAD ahead of the one being yielded
+    workers = workers or SCAN_WORKERS
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        queued = deque([str(folder)])  # found, not yet submitted; in yield order
+        listing: deque = deque()       # (dir, future), in yield order
+        while queued or listing:
+            while queued and len(listing) < workers * SCAN_LOOKAHEAD:
+                d = queued.popleft()
+                listing.append((d, pool.submit(_scan_dir, d, match, True, index)))
+            d, fut = listing.popleft()
+            fs, subdirs, mtime_ns = fut.result()
+            stamps.append((d, mtime_ns))
+            queued.extend(sorted(subdirs))
+            fs.sort()
+            yield from fs
+
+def _path_order(p: str) -> str:
+    # sorts like the same paths as Path objects (part by part) without building them:
+    # "\0" sorts below every character a name can hold
+    return os.path.normcase(p).replace(os.sep, "\0")
+
+def _walk(folder: Path, match: Optional[Match], recursive: bool, workers: Optional[int] = None,
+          memo_key=None) -> tuple[list[str], tuple[tuple[str, int], ...]]:
+    """
+    Returns (sorted candidate file paths, (dir, mtime_ns) for every directory scanned).
+    Listings come from the folder's scan index, so only directories changed since the last
+    scan are read. `memo_key` (a hashable description of `match`, None if it depends on
+    more than names) lets an unchanged tree return the previous result outright.
+    """
+    index = scan_index.get(folder)
+    with index.lock:
+        index.begin(str(folder))
+        if memo_key is not None:
+            hit = index.remembered((str(folder), recursive, memo_key))
+            if hit is not None:
+                return hit
+        stamps: list[tuple[str, int]] = []
+        # one order for the whole tree (path by path), which the seeded sample draws from
+        files = sorted(_iter_files(folder, match, recursive, stamps, workers, index), key=_path_order)
+        stamps = tuple(sorted(stamps))
+        index.finish(recursive)
+        if memo_key is not None:
+            index.remember((str(folder), recursive, memo_key), files, stamps)
+    return files, stamps
+
+def _stream_select(folder: Path, strength_percent: int, match: Optional[Match],
+                   recursive: bool, selector: Selector) -> tuple[int, list[Path], tuple[tuple[str, int], ...]]:
+    """
+    Two passes over the folder without ever holding its listing: the first counts the
+    candidates, the second picks exactly k of them with selection sampling.
+    Returns (total, chosen, stamps); memory is O(k).
+    """
+    stamps: list[tuple[str, int]] = []
+    total = sum(1 for _ in _iter_files(folder, match, recursive, stamps))
+    k = (total * strength_percent) // 100
+    chosen = [Path(p) for p in selector.stream(_iter_files(folder, match, recursive, []), total, k)]
+    # files removed between the passes can leave fewer than k; the stamps then no longer match
+    return total, chosen, tuple(sorted(stamps))
+
+def _memo_key(allowed_exts: Optional[Sequence[str]], file_filter: Optional[FileFilter]):
+    # size/age filters depend on file stats, which a directory's mtime doesn't cover
+    if file_filter is not None and file_filter.needs_stat:
+        return None
+    return exts_key(allowed_exts), file_filter
+
+def list_candidate_files(folder: Path, allowed_exts: Optional[Sequence[str]],
+                         recursive: bool = False, workers: Optional[int] = None,
+                         file_filter: Optional[FileFilter] = None) -> list[Path]:
     """
     allowed_exts:
       - None => all files
       - list of extensions like ['.png','.txt']
+    recursive: also walk subfolders (listed in parallel by `workers` threads); symlinks are never followed
+    file_filter: name globs / regex, size and age bounds, checked during the walk
+    """
+    files, _ = _walk(folder, compile_filter(allowed_exts, file_filter), recursive, workers,
+                     _memo_key(allowed_exts, file_filter))
+    return [Path(p) for p in files]
+
+def make_plan(folder: Path, strength_percent: int, allowed_exts: Optional[Sequence[str]],
+              recursive: bool = False, streaming: bool = False, selector: Optional[Selector] = None,
+              metrics: Optional[SnapMetrics] = None, file_filter: Optional[FileFilter] = None) -> SnapPlan:
+    """
+    streaming: pick files in two passes instead of listing and sorting the whole folder
+    (for folders with millions of entries); the selection is just as uniform.
+    selector: seed / randomness source (default: a fresh random seed, recorded in the plan).
+    metrics: records "scan" and "sample" (a streaming scan samples as it goes: all "scan").
+    file_filter: see list_candidate_files; ages are measured from when the plan is made.
+    """
+    selector = selector or Selector()
+    match = compile_filter(allowed_exts, file_filter)
+    if streaming:
+        with timed(metrics, "scan") as ph:
+            total, chosen, stamps = _stream_select(folder, strength_percent, match, recursive, selector)
+            ph.files += total
+        to_remove = len(chosen)
+    else:
+        with timed(metrics, "scan") as ph:
+            files, stamps = _walk(folder, match, recursive, memo_key=_memo_key(allowed_exts, file_filter))
+            ph.files += len(files)
+        total = len(files)
+        to_remove = (total * strength_percent) // 100
+        with timed(metrics, "sample") as ph:
+            # only the chosen paths become Path objects
+            chosen = [Path(p) for p in selector.sample(files, to_remove)]
+            ph.files += to_remove
+    preview = [str(p.relative_to(folder)) for p in chosen[:30]]
+    return SnapPlan(total=total, to_remove=to_remove, targets_preview=preview,
+                    target=folder, mode="folder", strength_percent=strength_percent,
+                    allowed_exts=exts_key(allowed_exts), recursive=recursive, file_filter=file_filter,
+                    selected=chosen, fingerprint=stamps, seed=selector.seed)
+
+class _NameLocks:
+    """
+    One lock per file name. send2trash picks a free name in the Trash and only then moves
+    the file there, so two files of the same name trashed at once (a/x.txt and b/x.txt) can
+    get the same name, and the second move silently replaces the first.
     """
-    files: list[Path] = []
-    for item in folder.iterdir():
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._held: dict[str, list] = {}  # name -> [lock, users]
+
+    @contextmanager
+    def hold(self, name: str) -> Iterator[None]:
+        name = os.path.normcase(name)  # Trash names clash case-insensitively on Windows / macOS
+        with self._lock:
+            entry = self._held.setdefault(name, [threading.Lock(), 0])
+            entry[1] += 1
         try:
-            if not item.is_file() or item.is_symlink():
-                continue
-            if allowed_exts is None:
-                files.append(item)
-            else:
-                if item.suffix.lower() in allowed_exts:
-                    files.append(item)
-        except Exception:
-            continue
-    return sorted(files)
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._held[name]
 
-def make_plan(folder: Path, strength_percent: int, allowed_exts: Optional[Sequence[str]]) -> SnapPlan:
-    files = list_candidate_files(folder, allowed_exts)
-    total = len(files)
-    to_remove = (total * strength_percent) // 100
-    chosen = unbiased_sample(files, to_remove)
-    preview = [p.name for p in chosen[:30]]
-    return SnapPlan(total=total, to_remove=to_remove, targets_preview=preview)
+# shared by every snap in the process: concurrent folder snaps share the Trash too
+_trash_names = _NameLocks()
 
-def execute(folder: Path, strength_percent: int, allowed_exts: Optional[Sequence[str]], progress_cb=None) -> tuple[int, int]:
+def _trash_one(send2trash, f: Path) -> bool:
+    try:
+        with _trash_names.hold(f.name):
+            send2trash(str(f))
+        return True
+    except Exception:
+        return False
+
+def trash_files(files: Iterable[Path], total: int, progress_cb=None, workers: int = 1,
+                cancel: Optional[threading.Event] = None) -> tuple[int, int]:
     """
-    Deletes chosen files to Recycle Bin/Trash (NOT permanent).
+    Sends files to Recycle Bin/Trash, `workers` at a time (1 = serial, in order).
+    Completion order is not preserved; files of the same name are never trashed at the same
+    time (see _NameLocks). Setting `cancel` stops new work; requests that
+    have not started yet are dropped and counted neither as deleted nor failed.
     Returns: (deleted_ok, failed)
     """
-    files = list_candidate_files(folder, allowed_exts)
-    total = len(files)
-    to_remove = (total * strength_percent) // 100
-    chosen = unbiased_sample(files, to_remove)
+    # imported at the first folder snap rather than at startup
+    from send2trash import send2trash
 
     deleted_ok = 0
     failed = 0
-    for idx, f in enumerate(chosen, start=1):
-        try:
-            send2trash(str(f))
-            deleted_ok += 1
-        except Exception:
-            failed += 1
-        if progress_cb:
-            progress_cb(idx, to_remove)
+
+    if workers <= 1:
+        for idx, f in enumerate(files, start=1):
+            if cancel is not None and cancel.is_set():
+                break
+            if _trash_one(send2trash, f):
+                deleted_ok += 1
+            else:
+                failed += 1
+            if progress_cb:
+                progress_cb(idx, total)
+        return deleted_ok, failed
+
+    def tally(done):
+        nonlocal deleted_ok, failed
+        for fut in done:
+            if fut.cancelled():
+                continue
+            if fut.result():
+                deleted_ok += 1
+            else:
+                failed += 1
+            if progress_cb:
+                progress_cb(deleted_ok + failed, total)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        for f in files:
+            if cancel is not None and cancel.is_set():
+                break
+            in_flight.add(pool.submit(_trash_one, send2trash, f))
+            if len(in_flight) >= workers * TRASH_QUEUE_PER_WORKER:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                tally(done)
+        if cancel is not None and cancel.is_set():
+            for fut in in_flight:
+                fut.cancel()
+        tally(wait(in_flight).done)
+    return deleted_ok, failed
+
+def execute(folder: Path, strength_percent: int, allowed_exts: Optional[Sequence[str]], progress_cb=None,
+            plan: Optional[SnapPlan] = None, recursive: bool = False, workers: int = 1,
+            cancel: Optional[threading.Event] = None, streaming: bool = False,
+            selector: Optional[Selector] = None, metrics: Optional[SnapMetrics] = None,
+            file_filter: Optional[FileFilter] = None) -> tuple[int, int]:
+    """
+    Deletes chosen files to Recycle Bin/Trash (NOT permanent).
+    A matching, still-current `plan` is executed as-is; otherwise the folder is planned afresh.
+    `workers` > 1 trashes files concurrently (see trash_files); `streaming`, `selector`,
+    `metrics` and `file_filter` as for make_plan; the deletions are recorded as "trash".
+    Returns: (deleted_ok, failed)
+    """
+    if (plan is None or not plan.matches(folder, "folder", strength_percent, allowed_exts, recursive, selector,
+                                         file_filter) or not plan.is_current()):
+        plan = make_plan(folder, strength_percent, allowed_exts, recursive, streaming, selector, metrics, file_filter)
+    with timed(metrics, "trash") as ph:
+        deleted_ok, failed = trash_files(plan.selected, plan.to_remove, progress_cb, workers, cancel)
+        ph.files += deleted_ok + failed
     return deleted_ok, failed
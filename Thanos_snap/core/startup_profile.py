@@ -0,0 +1,93 @@
+"""
+Startup timing for our own modules, like `python -X importtime` but limited to the app's
+packages and readable at a glance:
+
+    python main.py --startup-report
+
+prints, once the window has first been drawn, how long each core/ui module took to import
+(cumulative, and without its children) plus milestones such as "window built" and
+"first paint", then exits. Heavy third-party imports show up inside the module that
+triggered them, which is what to look at when startup regresses.
+"""
+from __future__ import annotations
+from importlib.abc import Loader, MetaPathFinder
+from importlib.machinery import PathFinder
+from typing import Optional, TextIO
+import sys
+import time
+
+# modules timed: our packages and top-level scripts
+TRACKED = ("core", "ui", "cli")
+
+class _TimedLoader(Loader):
+    def __init__(self, loader: Loader, profile: "StartupProfile"):
+        self.loader = loader
+        self.profile = profile
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.profile._enter(module.__name__)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profile._exit()
+
+    def __getattr__(self, name):  # get_data, get_filename, … for whoever asks the loader
+        return getattr(self.loader, name)
+
+class StartupProfile(MetaPathFinder):
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.imports: list[tuple[int, str, float, float]] = []  # depth, name, cumulative, self
+        self.marks: list[tuple[str, float]] = []
+        self._stack: list[list] = []  # [name, start, time spent in children]
+
+    # -- import hook --
+    def find_spec(self, name, path, target=None):
+        if name.split(".")[0] not in TRACKED:
+            return None
+        spec = PathFinder.find_spec(name, path, target)
+        if spec is not None and spec.loader is not None:
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def _enter(self, name: str) -> None:
+        self._stack.append([name, time.perf_counter(), 0.0])
+        # reserve the slot now so the report lists parents before their children
+        self.imports.append((len(self._stack) - 1, name, 0.0, 0.0))
+        self._stack[-1].append(len(self.imports) - 1)
+
+    def _exit(self) -> None:
+        name, start, children, slot = self._stack.pop()
+        took = time.perf_counter() - start
+        self.imports[slot] = (len(self._stack), name, took, took - children)
+        if self._stack:
+            self._stack[-1][2] += took
+
+    # -- milestones --
+    def mark(self, label: str) -> None:
+        self.marks.append((label, time.perf_counter() - self.t0))
+
+    def report(self, out: TextIO = sys.stderr) -> None:
+        out.write("Thanos Snap startup (ms)\n  cumulative      self  module\n")
+        for depth, name, cum, own in self.imports:
+            out.write(f"  {cum * 1000:10.1f}{own * 1000:10.1f}  {'  ' * depth}{name}\n")
+        for label, at in self.marks:
+            out.write(f"  {at * 1000:10.1f}  {label}\n")
+        out.flush()
+
+_active: Optional[StartupProfile] = None
+
+def install() -> StartupProfile:
+    """Starts timing: modules imported from here on are recorded."""
+    global _active
+    _active = StartupProfile()
+    sys.meta_path.insert(0, _active)
+    return _active
+
+def mark(label: str) -> None:
+    """Records a milestone when a profile is running; free otherwise."""
+    if _active is not None:
+        _active.mark(label)
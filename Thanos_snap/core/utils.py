@@ -2,24 +2,47 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable, List, Optional
-import random
+from typing import BinaryIO, Callable, Iterable, List, Optional, Sequence, Tuple
+import hashlib
+import os
+import uuid
 
-_rng = random.SystemRandom()
+from core.file_filter import FileFilter
+from core.removal_mask import RemovalMask
+
+class SnapCancelled(Exception):
+    """Raised inside an engine when its cancel event is set; the target is left as it was."""
+
+def check_cancel(cancel) -> None:
+    if cancel is not None and cancel.is_set():
+        raise SnapCancelled()
 
 def stamp() -> str:
     return datetime.now().strftime("%Y%m%d-%H%M%S")
 
+def cache_dir() -> Path:
+    """Per-user cache for indexes that only speed things up (safe to delete at any time)."""
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "thanos_snap"
+
+def cache_path(kind: str, key: str) -> Path:
+    """The cache file for `key` (e.g. a resolved path): cache_dir()/<kind>/<sha256 of key, split 2/62>."""
+    digest = hashlib.sha256(key.encode("utf-8", "surrogateescape")).hexdigest()
+    return cache_dir() / kind / digest[:2] / digest[2:]
+
+def write_cache(dst: Path, write: Callable[[BinaryIO], None]) -> None:
+    """Writes a cache file through a temp file and a rename, so readers never see half of one."""
+    tmp = dst.with_name(f"{dst.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, dst)
+    except OSError:
+        tmp.unlink(missing_ok=True)  # a cache that can't be written only costs speed
+
 def confirm_phrase_ok(s: str) -> bool:
     return s.strip().lower() == "i am inevitable"
 
-def unbiased_sample(items: List[Path], k: int) -> List[Path]:
-    if k <= 0:
-        return []
-    if k >= len(items):
-        return list(items)
-    return list(_rng.sample(items, k))
-
 def normalize_exts(exts: Iterable[str]) -> List[str]:
     out = []
     for e in exts:
@@ -31,8 +54,60 @@ def normalize_exts(exts: Iterable[str]) -> List[str]:
         out.append(e.lower())
     return sorted(set(out))
 
+def fingerprint(path: Path) -> Tuple[int, int]:
+    """Cheap change detector for a document plan target: (size, mtime_ns)."""
+    st = path.stat()
+    return (st.st_size, st.st_mtime_ns)
+
+def dirs_unchanged(dir_stamps: Tuple[Tuple[str, int], ...]) -> bool:
+    """
+    Folder plans fingerprint every scanned directory as (path, mtime_ns). A directory's
+    mtime moves whenever entries are added, removed or renamed in it.
+    """
+    return all(os.stat(d).st_mtime_ns == m for d, m in dir_stamps)
+
+def exts_key(allowed_exts: Optional[Sequence[str]]) -> Optional[Tuple[str, ...]]:
+    return None if allowed_exts is None else tuple(allowed_exts)
+
 @dataclass
 class SnapPlan:
+    """
+    What a snap will do. Plans built by make_plan() also carry the actual selection
+    (`selected` paths for folders, a removal `mask` for documents) so execute() can
+    run exactly what was previewed without scanning the target again.
+    """
     total: int
     to_remove: int
     targets_preview: List[str]
+    target: Optional[Path] = None
+    mode: str = ""  # "folder" | "lines" | "chars" | "bytes"
+    strength_percent: int = 0
+    allowed_exts: Optional[Tuple[str, ...]] = None
+    recursive: bool = False
+    selected: Optional[List[Path]] = None
+    mask: Optional[RemovalMask] = None
+    fingerprint: Optional[tuple] = None
+    seed: Optional[int] = None  # None: picked with OS randomness, not reproducible
+    file_filter: Optional[FileFilter] = None  # folder plans: name/size/age filter on top of the extensions
+
+    def matches(self, target: Path, mode: str, strength_percent: int,
+                allowed_exts: Optional[Sequence[str]] = None, recursive: bool = False,
+                selector=None, file_filter: Optional[FileFilter] = None) -> bool:
+        """`selector`: when given, the plan must also have been picked with its seed."""
+        return (self.target == target and self.mode == mode
+                and self.strength_percent == strength_percent
+                and self.allowed_exts == exts_key(allowed_exts)
+                and self.recursive == recursive
+                and self.file_filter == file_filter
+                and (selector is None or self.seed == selector.seed))
+
+    def is_current(self) -> bool:
+        """True while the target is unchanged since the plan was made."""
+        if self.target is None or self.fingerprint is None:
+            return False
+        try:
+            if self.mode == "folder":
+                return dirs_unchanged(self.fingerprint)
+            return fingerprint(self.target) == self.fingerprint
+        except OSError:
+            return False
@@ -1,7 +1,25 @@
-from ui.app import ThanosSnapApp
+import sys
 
 def main():
+    # --startup-report: time our imports and the first paint, print them, exit
+    profile = None
+    if sys.argv[1:] == ["--startup-report"]:
+        from core import startup_profile
+        profile = startup_profile.install()
+    # with arguments: headless runner, which never imports tkinter or Pillow
+    elif len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from ui.app import ThanosSnapApp
     app = ThanosSnapApp()
+    if profile is not None:
+        profile.mark("window built")
+        app.update()  # runs the pending map/redraw work: the window is on screen after this
+        profile.mark("first paint")
+        profile.report()
+        app.destroy()
+        return
     app.mainloop()
 
 if __name__ == "__main__":
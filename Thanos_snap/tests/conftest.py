@@ -0,0 +1,16 @@
+from pathlib import Path
+import os
+import sys
+import tempfile
+
+# run from anywhere: the app imports its modules as core.*, ui.*, bench.*
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# send2trash reads XDG_DATA_HOME when first imported: trashed test files (and caches)
+# stay in a scratch dir, never the user's
+_scratch = Path(tempfile.mkdtemp(prefix="thanos_tests_"))
+os.environ["XDG_DATA_HOME"] = str(_scratch / "data")
+os.environ["XDG_CACHE_HOME"] = str(_scratch / "cache")
+
+def trash_dir() -> Path:
+    return _scratch / "data" / "Trash" / "files"
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from core import backup, backup_pipeline, jobs
+
+def test_folder_backups_in_the_same_second_never_share_a_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, "stamp", lambda: "20260101_000000")
+    results = []
+    for name in ("a", "b"):
+        folder = tmp_path / name
+        folder.mkdir()
+        f = folder / "x.txt"
+        f.write_text(name)
+        results.append(backup.backup_folder_files([f], tmp_path / "bk", root=folder, allow_hardlink=True))
+    assert results[0].path != results[1].path
+    assert [(r.path / "x.txt").read_text() for r in results] == ["a", "b"]
+
+def test_pipelined_backups_in_the_same_second_never_share_a_mirror(tmp_path, monkeypatch):
+    monkeypatch.setattr(backup_pipeline, "stamp", lambda: "20260101_000000")
+    pipes = []
+    for name in ("a", "b"):
+        folder = tmp_path / name
+        folder.mkdir()
+        files = [folder / f"x{i}.txt" for i in range(50)]
+        for f in files:
+            f.write_text(name)
+        pipes.append(backup_pipeline.PipelinedBackup(files, tmp_path / "bk", root=folder).start())
+    for pipe in pipes:
+        for f in pipe.flushed():
+            f.unlink()  # as the snap trashes them
+    paths = [pipe.finish().path for pipe in pipes]
+    assert paths[0] != paths[1]
+    for path, name in zip(paths, ("a", "b")):
+        assert {p.read_text() for p in path.iterdir()} == {name}
+
+def test_document_backup_survives_an_append_after_a_no_op_snap(tmp_path):
+    doc = tmp_path / "app.log"
+    doc.write_text("a\nb\nc\nd\n")
+    result = jobs.run_document_snap(doc, 10, ["lines"], backup_dir=tmp_path / "bk")  # removes nothing
+    with open(doc, "a") as f:
+        f.write("appended\n")
+    assert Path(result["backup"]).read_text() == "a\nb\nc\nd\n"
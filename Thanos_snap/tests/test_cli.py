@@ -0,0 +1,33 @@
+import cli
+
+def _labels(groups):
+    return [[cli._target_label(t) for t in g] for g in groups]
+
+def test_overlapping_targets_share_a_group(tmp_path):
+    (tmp_path / "docs" / "sub").mkdir(parents=True)
+    (tmp_path / "docs" / "sub" / "d1.log").write_text("a\n")
+    (tmp_path / "docs" / "d2.log").write_text("b\n")
+    (tmp_path / "other").mkdir()
+    (tmp_path / "other" / "x.txt").write_text("c\n")
+    (tmp_path / "share" / "nested").mkdir(parents=True)
+    (tmp_path / "apart").mkdir()
+    targets = [
+        {"document": str(tmp_path / "docs" / "**" / "*.log")},
+        {"document": str(tmp_path / "other" / "x.txt")},
+        {"document": str(tmp_path / "docs" / "sub" / ".." / "sub" / "d1.log")},
+        {"folder": str(tmp_path / "share")},
+        {"folder": str(tmp_path / "share" / "nested")},
+        {"folder": str(tmp_path / "apart")},
+        {"folder": str(tmp_path / "other")},
+    ]
+    groups = _labels(cli._groups(targets))
+    assert sorted(groups) == sorted([
+        [targets[0]["document"], targets[2]["document"]],
+        [targets[1]["document"], targets[6]["folder"]],
+        [targets[3]["folder"], targets[4]["folder"]],
+        [targets[5]["folder"]],
+    ])
+
+def test_unresolvable_targets_run_alone(tmp_path):
+    targets = [{"folder": str(tmp_path / "missing")}, {"document": str(tmp_path / "none*.txt")}]
+    assert len(cli._groups(targets)) == 2
@@ -0,0 +1,12 @@
+import pytest
+
+from core.file_filter import FileFilter, FilterError
+
+def test_parse_bounds():
+    f = FileFilter.parse("size>1.5M size<.5G age>30d *.log*")
+    assert (f.min_size, f.max_size, f.min_age, f.globs) == (3 << 19, 1 << 29, 30 * 86400, ("*.log*",))
+
+@pytest.mark.parametrize("text", ["size>1.2.3M", "size>.", "size>", "age<1..2d", "size>10Q", "re:("])
+def test_bad_terms_raise_filter_error(text):
+    with pytest.raises(FilterError):
+        FileFilter.parse(text)
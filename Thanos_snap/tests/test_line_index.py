@@ -0,0 +1,47 @@
+import os
+
+from core import line_index
+
+def _doc(path, lines: int, end: bytes = b"\n"):
+    # lines of varying length, so they straddle the index blocks at different offsets
+    path.write_bytes(b"".join(b"%d %s" % (i, b"x" * (i % 97)) + end for i in range(lines)))
+    return path
+
+def test_line_start_matches_the_document(tmp_path):
+    doc = _doc(tmp_path / "doc.txt", 60_000, b"\r\n")  # a few MB: several blocks
+    idx = line_index.LineIndex.build(doc)
+    lines = doc.read_bytes().splitlines()
+    assert idx.total == len(lines)
+    with open(doc, "rb") as f:
+        for i in [0, 1, 17, 12_345, 30_000, len(lines) - 1]:
+            assert idx.read_line(f, i) == lines[i][:320]
+
+def test_last_line_without_newline_counts(tmp_path):
+    doc = tmp_path / "doc.txt"
+    doc.write_bytes(b"a\nb\nc")
+    assert line_index.LineIndex.build(doc).total == 3
+    doc.write_bytes(b"")
+    assert line_index.LineIndex.build(doc).total == 0
+
+def test_cache_is_used_until_the_document_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(line_index, "MIN_CACHED_SIZE", 0)
+    doc = _doc(tmp_path / "doc.txt", 1000)
+    first = line_index.get(doc)
+    assert first.bytes_read == doc.stat().st_size
+    again = line_index.get(doc)
+    assert (again.total, again.bytes_read) == (1000, 0)  # loaded, nothing read
+
+    with open(doc, "ab") as f:
+        f.write(b"one more\n")
+    assert line_index.get(doc).total == 1001
+
+    # same size, new mtime: stale too
+    st = doc.stat()
+    doc.write_bytes(doc.read_bytes().replace(b"one more", b"ONE MORE"))
+    os.utime(doc, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert line_index.get(doc).bytes_read == doc.stat().st_size
+
+def test_small_documents_are_not_cached(tmp_path):
+    doc = _doc(tmp_path / "doc.txt", 10)
+    line_index.get(doc)
+    assert not line_index._cache_path(doc).exists()
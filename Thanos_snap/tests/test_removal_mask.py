@@ -0,0 +1,45 @@
+import pytest
+
+from core import removal_mask
+from core.removal_mask import RemovalMask
+from core.selection import Selector, optional_numpy
+
+needs_numpy = pytest.mark.skipif(optional_numpy() is None, reason="numpy path")
+
+@pytest.fixture(params=["numpy", "python"])
+def sampler(request, monkeypatch):
+    if request.param == "numpy":
+        if optional_numpy() is None:
+            pytest.skip("numpy path")
+    else:
+        monkeypatch.setattr(removal_mask, "optional_numpy", lambda: None)
+    return request.param
+
+@pytest.mark.parametrize("total,k", [(1, 1), (13, 0), (13, 5), (13, 12), (1000, 999), (100_003, 50_001),
+                                     (removal_mask.SAMPLE_CHUNK + 9, 3)])
+def test_sample_marks_exactly_k(sampler, total, k):
+    mask = RemovalMask.sample(total, k, Selector(7))
+    assert mask.count() == k
+    if total % 8:
+        assert mask.bits[-1] >> (total % 8) == 0  # nothing marked past the end
+
+def test_sample_is_reproducible(sampler):
+    masks = [RemovalMask.sample(50_000, 20_000, Selector(42)) for _ in range(3)]
+    assert masks[0].bits == masks[1].bits == masks[2].bits
+    assert RemovalMask.sample(50_000, 20_000, Selector(43)).bits != masks[0].bits
+
+def test_keep_selectors_and_keep_array_agree():
+    mask = RemovalMask.sample(1001, 400, Selector(1))
+    expected = bytes(0 if i in mask else 1 for i in range(1001))
+    for start, stop in [(0, 1001), (3, 17), (8, 16), (999, 1001)]:
+        assert mask.keep_selectors(start, stop) == expected[start:stop]
+        if optional_numpy() is not None:
+            assert bytes(mask.keep_array(start, stop).astype("uint8")) == expected[start:stop]
+
+@needs_numpy
+def test_numpy_sample_past_the_hypergeometric_limit():
+    # more than 10**9 positions (a 1 GB document) ahead of the first chunk
+    total = (1 << 30) + 5
+    masks = [RemovalMask.sample(total, 7, Selector(3)) for _ in range(2)]
+    assert masks[0].count() == 7
+    assert masks[0].bits == masks[1].bits
@@ -0,0 +1,36 @@
+import os
+
+from core import restore
+from core.backup_archive import ArchiveBackup
+
+def test_restore_from_truncated_archive(tmp_path):
+    folder = tmp_path / "f"
+    folder.mkdir()
+    files = []
+    for i in range(600):
+        f = folder / f"{i:03}.bin"
+        f.write_bytes(os.urandom(2000))  # incompressible, so the cut lands mid-archive
+        files.append(f)
+    contents = {f.name: f.read_bytes() for f in files}
+    arch = ArchiveBackup(files, tmp_path / "bk", root=folder).start()
+    for f in arch.flushed():
+        f.unlink()
+    path = arch.finish().path
+
+    # a crash or full disk: the archive stops partway through a member
+    with open(path, "r+b") as fh:
+        fh.truncate(path.stat().st_size // 2 + 1234)
+
+    record = restore.load_record(path)
+    assert 0 < len(record["files"]) < 600
+    record["files"] = [f.name for f in files]  # as the snap record lists them
+    assert restore.restore(record, dry_run=True)["would_restore"] == 600
+
+    result = restore.restore(record)
+    assert result["restored"] > 0
+    assert result["restored"] + len(result["missing"]) == 600
+    assert not result["failed"] and not result["conflicts"]
+    back = [f for f in files if f.exists()]
+    assert len(back) == result["restored"]
+    assert all(f.read_bytes() == contents[f.name] for f in back)
+    assert not list(folder.glob(".*"))  # no temp file left from the member cut in half
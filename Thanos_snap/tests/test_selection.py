@@ -0,0 +1,37 @@
+import pytest
+
+from core import selection
+from core.selection import Selector, optional_numpy
+
+@pytest.mark.parametrize("n", [100, selection.NUMPY_SAMPLE_MIN + 1])  # random.sample / numpy
+def test_sample_is_reproducible_and_exact(n):
+    items = list(range(n))
+    picks = [Selector(8).sample(items, n // 3) for _ in range(2)]
+    assert picks[0] == picks[1]
+    assert len(set(picks[0])) == n // 3
+    assert Selector(9).sample(items, n // 3) != picks[0]
+
+def test_sample_edges():
+    assert Selector(1).sample([1, 2, 3], 0) == []
+    assert Selector(1).sample([1, 2, 3], 5) == [1, 2, 3]
+
+def test_stream_picks_exactly_k_in_order():
+    picks = list(Selector(4).stream(iter(range(10_000)), 10_000, 2_500))
+    assert len(picks) == 2_500
+    assert picks == sorted(picks)
+    assert picks == list(Selector(4).stream(iter(range(10_000)), 10_000, 2_500))
+
+def test_derived_selectors_are_reproducible_and_independent():
+    a, b = Selector(5).derive("a.txt"), Selector(5).derive("b.txt")
+    assert a.seed == Selector(5).derive("a.txt").seed
+    assert a.seed != b.seed
+
+def test_secure_selector_has_no_seed():
+    s = Selector(secure=True)
+    assert s.seed is None
+    assert Selector.replaying(None).secure
+    assert Selector.replaying(12).seed == 12
+
+@pytest.mark.skipif(optional_numpy() is None, reason="numpy path")
+def test_numpy_generator_is_seeded():
+    assert Selector(3).numpy().integers(1 << 62) == Selector(3).numpy().integers(1 << 62)
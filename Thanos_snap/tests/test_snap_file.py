@@ -0,0 +1,72 @@
+import pytest
+
+from core import snap_file
+from core.selection import Selector
+
+def _lines_snap(doc, strength, seed=5):
+    before = doc.read_bytes().splitlines(keepends=True)
+    removed, kept = snap_file.execute(doc, strength, "lines", selector=Selector(seed))
+    return before, doc.read_bytes().splitlines(keepends=True), removed, kept
+
+@pytest.mark.parametrize("ending", [b"\n", b"\r\n"])
+def test_lines_snap_keeps_survivors_byte_identical(tmp_path, ending):
+    doc = tmp_path / "doc.txt"
+    doc.write_bytes(b"".join(f"line {i} é".encode() + ending for i in range(1000)))
+    before, after, removed, kept = _lines_snap(doc, 30)
+    assert (removed, kept) == (300, 700)
+    assert len(after) == 700
+    survivors = set(after)
+    assert after == [line for line in before if line in survivors]  # same bytes, same order
+
+def test_lines_snap_counts_a_last_line_without_newline(tmp_path):
+    doc = tmp_path / "doc.txt"
+    doc.write_bytes(b"a\r\nb\nc\r\nd")
+    assert snap_file.make_plan(doc, 50, "lines").total == 4
+    before, after, removed, kept = _lines_snap(doc, 50)
+    assert (removed, kept) == (2, 2)
+    assert len(after) == 2 and after == [line for line in before if line in set(after)]
+
+@pytest.mark.parametrize("mode", ["lines", "chars", "bytes"])
+def test_empty_document_is_left_alone(tmp_path, mode):
+    doc = tmp_path / "empty.txt"
+    doc.write_bytes(b"")
+    assert snap_file.execute(doc, 90, mode) == (0, 0)
+    assert doc.read_bytes() == b""
+    assert list(tmp_path.iterdir()) == [doc]  # no temp file left behind
+
+def test_lines_snap_repeats_with_the_same_seed(tmp_path):
+    docs = []
+    for name in ("a.txt", "b.txt"):
+        doc = tmp_path / name
+        doc.write_bytes(b"".join(b"%d\n" % i for i in range(5000)))
+        snap_file.execute(doc, 50, "lines", selector=Selector(99))
+        docs.append(doc.read_bytes())
+    assert docs[0] == docs[1]
+
+def _rewrite_both_ways(tmp_path, monkeypatch, mode, data: bytes):
+    """Snaps two copies with the same plan seed: numpy (when installed) vs pure Python."""
+    outs = []
+    for name, np_off in (("np.txt", False), ("py.txt", True)):
+        doc = tmp_path / name
+        doc.write_bytes(data)
+        plan = snap_file.make_plan(doc, 40, mode, Selector(3))
+        with monkeypatch.context() as m:
+            if np_off:
+                m.setattr(snap_file, "optional_numpy", lambda: None)
+            removed, kept = snap_file.execute(doc, 40, mode, plan=plan)
+        assert (removed, kept) == (plan.to_remove, plan.total - plan.to_remove)
+        outs.append((plan, doc.read_bytes()))
+    assert outs[0][1] == outs[1][1]
+    return outs[0]
+
+def test_bytes_snap_removes_exactly_the_planned_bytes(tmp_path, monkeypatch):
+    data = bytes(range(256)) * (snap_file.CHAR_CHUNK // 256 * 2 + 3)  # spans three chunks
+    plan, out = _rewrite_both_ways(tmp_path, monkeypatch, "bytes", data)
+    assert plan.total == len(data) and plan.to_remove == len(data) * 40 // 100
+    assert out == bytes(b for i, b in enumerate(data) if i not in plan.mask)
+
+def test_chars_snap_removes_exactly_the_planned_characters(tmp_path, monkeypatch):
+    text = "Perfectly balanced — as all things should be. ∞\r\n" * 50_000
+    plan, out = _rewrite_both_ways(tmp_path, monkeypatch, "chars", text.encode("utf-8"))
+    assert plan.total == len(text) and plan.to_remove == len(text) * 40 // 100
+    assert out.decode("utf-8") == "".join(c for i, c in enumerate(text) if i not in plan.mask)
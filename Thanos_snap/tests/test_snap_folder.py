@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+from conftest import trash_dir
+from core import snap_folder
+from core.file_filter import FileFilter
+from core.selection import Selector
+
+@pytest.mark.skipif(sys.platform != "linux", reason="checks the freedesktop Trash")
+def test_parallel_trash_keeps_same_named_files(tmp_path):
+    # every directory holds the same name; a racy trash would overwrite earlier ones
+    files = []
+    for i in range(500):
+        d = tmp_path / f"d{i}"
+        d.mkdir()
+        f = d / "same.txt"
+        f.write_text(str(i))
+        files.append(f)
+    before = len(list(trash_dir().glob("same*.txt"))) if trash_dir().exists() else 0
+
+    deleted, failed = snap_folder.trash_files(files, len(files), workers=32)
+
+    assert (deleted, failed) == (500, 0)
+    assert not any(f.exists() for f in files)
+    trashed = sorted(trash_dir().glob("same*.txt"))
+    assert len(trashed) - before == 500
+    assert {p.read_text() for p in trashed} >= {str(i) for i in range(500)}
+
+def test_streaming_pick_is_reproducible(tmp_path):
+    for i in range(200):
+        d = tmp_path / f"a{i % 7}" / f"d{i}"
+        d.mkdir(parents=True)
+        for j in range(10):
+            (d / f"f{j}.txt").touch()
+    picks = [snap_folder.make_plan(tmp_path, 30, None, recursive=True, streaming=True,
+                                   selector=Selector(11)).selected for _ in range(5)]
+    assert len(picks[0]) == 600
+    assert all(p == picks[0] for p in picks)
+
+def test_indexed_scan_skips_files_gone_since_listing(tmp_path):
+    for i in range(20):
+        (tmp_path / f"f{i}.log").write_text("x" * 100)
+    old = (1_600_000_000, 1_600_000_000)  # well before the scan: the index trusts the listing
+    os.utime(tmp_path, old)
+    size_filter = FileFilter.parse("size>10")
+    assert snap_folder.make_plan(tmp_path, 50, None, file_filter=size_filter).total == 20
+
+    # removed without the directory's mtime showing it: the index still lists the name
+    (tmp_path / "f3.log").unlink()
+    os.utime(tmp_path, old)
+    plan = snap_folder.make_plan(tmp_path, 50, None, file_filter=size_filter)
+    assert plan.total == 19
@@ -1,31 +1,38 @@
 from __future__ import annotations
+from typing import TYPE_CHECKING
 import tkinter as tk
-from PIL import Image, ImageTk
+
+if TYPE_CHECKING:
+    from PIL import Image, ImageTk
+
+# zoom sequence, relative to the animation height
+ZOOM = (1.0, 1.06, 1.12, 1.06, 1.0)
+TARGET_H = 220
+
+def frame_heights(target_h: int = TARGET_H) -> list[int]:
+    return [int(target_h * z) for z in ZOOM]
 
 class GauntletSnapAnimation:
     """
     Lightweight Tkinter animation:
     - quick zoom pulses
     - brief white flash
+    `images` maps each of frame_heights() to the pre-rendered gauntlet at that height.
     """
-    def __init__(self, parent: tk.Widget, pil_image: Image.Image, bg: str):
+    def __init__(self, parent: tk.Widget, images: dict[int, Image.Image], bg: str):
         self.parent = parent
-        self.base = pil_image.convert("RGBA")
+        self.images = images
         self.bg = bg
         self.top: tk.Toplevel | None = None
         self.label: tk.Label | None = None
         self.flash: tk.Frame | None = None
         self.frames: list[ImageTk.PhotoImage] = []
 
-    def _build_frames(self, target_h=220):
-        self.frames.clear()
-        # zoom sequence
-        heights = [target_h, int(target_h*1.06), int(target_h*1.12), int(target_h*1.06), target_h]
-        for h in heights:
-            ratio = h / self.base.height
-            w = int(self.base.width * ratio)
-            img = self.base.resize((w, h), Image.LANCZOS)
-            self.frames.append(ImageTk.PhotoImage(img))
+    def _build_frames(self, target_h=TARGET_H):
+        from PIL import ImageTk
+        # one Tk image per distinct size; the sequence reuses them
+        photos = {h: ImageTk.PhotoImage(self.images[h]) for h in set(frame_heights(target_h))}
+        self.frames = [photos[h] for h in frame_heights(target_h)]
 
     def play(self, on_done):
         self.top = tk.Toplevel(self.parent)
@@ -45,7 +52,7 @@ class GauntletSnapAnimation:
         y = py + (ph - h)//2
         self.top.geometry(f"{w}x{h}+{x}+{y}")
 
-        self._build_frames(target_h=220)
+        self._build_frames()
 
         self.label = tk.Label(self.top, bg=self.bg)
         self.label.place(relx=0.5, rely=0.5, anchor="center")
@@ -1,25 +1,49 @@
 from __future__ import annotations
 
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
-
-from PIL import Image, ImageTk
+from typing import Optional
 
 from ui.theme import apply_dark_theme
-from ui.animation import GauntletSnapAnimation
+from ui.animation import GauntletSnapAnimation, frame_heights
+from ui import gauntlet_cache
 from ui.widgets import MultiSelectList
 
 from core.quotes import random_quote
-from core.utils import confirm_phrase_ok, normalize_exts
-from core.backup import backup_file, backup_folder_files
-from core import snap_folder, snap_file
+from core.utils import SnapCancelled, cache_dir, confirm_phrase_ok, normalize_exts, stamp
+from core.file_filter import FileFilter, FilterError
+from core.log_sink import LogSink, prune_spill_files
+from core.progress import ProgressSlot
+from core.selection import Selector
+from core import jobs, snap_folder, snap_file
 
 
 APP_DIR = Path(__file__).resolve().parents[1]
 ASSETS_DIR = APP_DIR / "assets"
 GAUNTLET_PATH = ASSETS_DIR / "gauntlet.png"
 
+# header thumbnail height
+HEADER_GAUNTLET_H = 150
+
+# how often the UI drains snap events and repaints progress while a snap runs (~30 fps)
+FRAME_MS = 33
+
+def _problems(result: dict) -> list[str]:
+    """What a finished snap's result reports as having gone wrong (see core/jobs.py)."""
+    problems = []
+    if "error" in result:
+        problems.append(f"{result['target']}: {result['error']}")
+    if result.get("not_backed_up"):
+        problems.append(f"{result['not_backed_up']} files could not be backed up and were kept.")
+    if result.get("failed"):
+        problems.append(f"{result['failed']} files could not be moved to Trash.")
+    for e in result.get("errors", ()):
+        problems.append(f"{e['target']}: {e['error']}")
+    return problems
+
 
 class ThanosSnapApp(tk.Tk):
     def __init__(self):
@@ -37,31 +61,74 @@ class ThanosSnapApp(tk.Tk):
 
         # selections
         self.snap_strength = tk.IntVar(value=50)
+        self.snap_seed = tk.StringVar()  # blank: a new random seed per snap
+        self.secure_random = tk.BooleanVar(value=False)
 
         # menu choices (multi)
         self.do_folder_snap = tk.BooleanVar(value=True)
         self.do_doc_lines = tk.BooleanVar(value=False)
         self.do_doc_chars = tk.BooleanVar(value=False)
+        self.do_doc_bytes = tk.BooleanVar(value=False)
 
         # targets
         self.folder_path = tk.StringVar()
-        self.file_path = tk.StringVar()
+        self.folder_recursive = tk.BooleanVar(value=False)
+        self.folder_streaming = tk.BooleanVar(value=False)  # low-memory selection for huge folders
+        self.folder_filter = tk.StringVar()  # e.g. "size>100M age>30d *.log*" (see core/file_filter.py)
+        self.trash_workers = tk.IntVar(value=4)
+        self.file_path = tk.StringVar()  # one or more paths / glob patterns, separated by ";"
 
         # backups
         self.backup_enabled = tk.BooleanVar(value=True)
         self.backup_dir = tk.StringVar(value=str((Path.home() / "ThanosSnapBackups").resolve()))
+        self.backup_mode = tk.StringVar(value="copies")  # "copies" | "store" | "archive"
 
         # confirmation
         self.confirm_phrase = tk.StringVar()
 
+        # last previewed plan per snap type ("folder" / "lines" / "chars" / "bytes")
+        self._plans = {}
+
+        # log lines (from any thread) go through the sink; the view takes them once per frame.
+        # The full session log is spilled to a file, the view keeps the last lines only.
+        log_dir = cache_dir() / "logs"
+        prune_spill_files(log_dir)
+        self._sink = LogSink(spill_path=log_dir / f"session_{stamp()}.log")
+        self._log_flush_scheduled = False
+
+        # snap worker: logs to _sink, posts its outcome to _events, progress to _progress, watches _cancel
+        self._events: queue.Queue = queue.Queue()
+        self._progress = ProgressSlot()
+        self._cancel = threading.Event()
+        self._worker: threading.Thread | None = None
+        self._close_when_done = False
+
         self._load_gauntlet()
         self._build_ui()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
     def _load_gauntlet(self):
+        # thumbnail + animation frames are resized (or loaded from the cache) off the Tk thread
+        self._gauntlet = gauntlet_cache.prerender(GAUNTLET_PATH, [HEADER_GAUNTLET_H, *frame_heights()])
+
+    def _gauntlet_images(self) -> Optional[dict]:
+        """The pre-rendered gauntlet sizes (waits for them), None if the asset is unusable."""
         try:
-            self.gauntlet_img = Image.open(GAUNTLET_PATH).convert("RGBA")
+            return self._gauntlet.result()
         except Exception:
-            self.gauntlet_img = None
+            return None
+
+    def _show_gauntlet(self):
+        if not self._gauntlet.done():
+            self.after(FRAME_MS, self._show_gauntlet)
+            return
+        images = self._gauntlet_images()
+        if images:
+            from PIL import ImageTk  # already loaded by the render thread
+            self.gauntlet_photo = ImageTk.PhotoImage(images[HEADER_GAUNTLET_H])
+            self.gauntlet_label.configure(image=self.gauntlet_photo)
+        else:
+            self.gauntlet_label.configure(text="(gauntlet.png missing)")
 
     def _build_ui(self):
         top = ttk.Frame(self)
@@ -81,16 +148,7 @@ class ThanosSnapApp(tk.Tk):
         self.gauntlet_label = ttk.Label(right)
         self.gauntlet_label.pack()
 
-        if self.gauntlet_img:
-            img = self.gauntlet_img.copy()
-            h = 150
-            ratio = h / img.height
-            w = int(img.width * ratio)
-            img = img.resize((w, h), Image.LANCZOS)
-            self.gauntlet_photo = ImageTk.PhotoImage(img)
-            self.gauntlet_label.configure(image=self.gauntlet_photo)
-        else:
-            self.gauntlet_label.configure(text="(gauntlet.png missing)")
+        self._show_gauntlet()
 
         main = ttk.Frame(self)
         main.pack(fill="both", expand=True, padx=22, pady=(0, 12))
@@ -130,6 +188,8 @@ class ThanosSnapApp(tk.Tk):
                         variable=self.do_doc_lines).pack(anchor="w", pady=2)
         ttk.Checkbutton(box, text="Document Snap — Characters (permanent: remove % of characters)",
                         variable=self.do_doc_chars).pack(anchor="w", pady=2)
+        ttk.Checkbutton(box, text="Document Snap — Bytes (permanent: remove % of raw bytes, no decoding)",
+                        variable=self.do_doc_bytes).pack(anchor="w", pady=2)
 
         btnrow = ttk.Frame(wrap, style="Panel.TFrame")
         btnrow.pack(fill="x", pady=(4, 12))
@@ -150,6 +210,14 @@ class ThanosSnapApp(tk.Tk):
                                    font=("Segoe UI Semibold", 11))
         self.str_label.pack(anchor="w", pady=(6, 10))
 
+        srow = ttk.Frame(wrap, style="Panel.TFrame")
+        srow.pack(fill="x", pady=(0, 10))
+        ttk.Label(srow, text="Seed:", background=self.colors["panel"],
+                  foreground=self.colors["muted"]).pack(side="left")
+        ttk.Entry(srow, textvariable=self.snap_seed, width=22).pack(side="left", padx=8)
+        ttk.Checkbutton(srow, text="OS randomness (not reproducible)",
+                        variable=self.secure_random).pack(side="left")
+
         # Backup options (global)
         ttk.Label(wrap, text="Backup Options", background=self.colors["panel"], foreground=self.colors["text"],
                   font=("Segoe UI Semibold", 12)).pack(anchor="w", pady=(10, 6))
@@ -157,6 +225,14 @@ class ThanosSnapApp(tk.Tk):
         ttk.Checkbutton(wrap, text="Create backups before snapping (recommended)",
                         variable=self.backup_enabled).pack(anchor="w")
 
+        mrow = ttk.Frame(wrap, style="Panel.TFrame")
+        mrow.pack(fill="x", pady=(6, 0))
+        ttk.Radiobutton(mrow, text="Plain copies", value="copies", variable=self.backup_mode).pack(side="left")
+        ttk.Radiobutton(mrow, text="Deduplicating store", value="store",
+                        variable=self.backup_mode).pack(side="left", padx=(12, 0))
+        ttk.Radiobutton(mrow, text="Compressed archive", value="archive",
+                        variable=self.backup_mode).pack(side="left", padx=(12, 0))
+
         brow = ttk.Frame(wrap, style="Panel.TFrame")
         brow.pack(fill="x", pady=(8, 0))
         ttk.Entry(brow, textvariable=self.backup_dir).pack(side="left", fill="x", expand=True)
@@ -171,8 +247,12 @@ class ThanosSnapApp(tk.Tk):
         # Action buttons
         act = ttk.Frame(wrap, style="Panel.TFrame")
         act.pack(fill="x", pady=(16, 0))
-        ttk.Button(act, text="Preview Plan", style="Accent.TButton", command=self.preview).pack(side="left")
-        ttk.Button(act, text="SNAP", style="Danger.TButton", command=self.snap).pack(side="right")
+        self.preview_btn = ttk.Button(act, text="Preview Plan", style="Accent.TButton", command=self.preview)
+        self.preview_btn.pack(side="left")
+        self.snap_btn = ttk.Button(act, text="SNAP", style="Danger.TButton", command=self.snap)
+        self.snap_btn.pack(side="right")
+        self.cancel_btn = ttk.Button(act, text="Cancel", command=self._cancel_snap, state="disabled")
+        self.cancel_btn.pack(side="right", padx=(0, 8))
 
     def _build_target_panel(self, parent):
         wrap = ttk.Frame(parent, style="Panel.TFrame")
@@ -190,6 +270,13 @@ class ThanosSnapApp(tk.Tk):
         ttk.Label(frow, text="Folder:", background=self.colors["panel"], foreground=self.colors["muted"]).pack(side="left")
         ttk.Entry(frow, textvariable=self.folder_path).pack(side="left", fill="x", expand=True, padx=8)
         ttk.Button(frow, text="Choose", command=self._choose_folder).pack(side="left")
+        orow = ttk.Frame(wrap, style="Panel.TFrame")
+        orow.pack(fill="x", pady=(0, 8))
+        ttk.Checkbutton(orow, text="Include subfolders", variable=self.folder_recursive).pack(side="left")
+        ttk.Checkbutton(orow, text="Huge folder (low memory)", variable=self.folder_streaming).pack(side="left", padx=(12, 0))
+        ttk.Spinbox(orow, from_=1, to=32, width=4, textvariable=self.trash_workers).pack(side="right")
+        ttk.Label(orow, text="Parallel deletes:", background=self.colors["panel"],
+                  foreground=self.colors["muted"]).pack(side="right", padx=(0, 6))
 
         # Folder file type restriction
         ttk.Label(wrap, text="Folder file types (multi-select):",
@@ -209,12 +296,24 @@ class ThanosSnapApp(tk.Tk):
         ttk.Button(extbtn, text="Select All Types", command=self.ext_list.select_all).pack(side="left")
         ttk.Button(extbtn, text="Only ALL", command=self._select_only_all).pack(side="left", padx=8)
 
+        filrow = ttk.Frame(wrap, style="Panel.TFrame")
+        filrow.pack(fill="x", pady=(0, 2))
+        ttk.Label(filrow, text="Folder filter:", background=self.colors["panel"],
+                  foreground=self.colors["muted"]).pack(side="left")
+        ttk.Entry(filrow, textvariable=self.folder_filter).pack(side="left", fill="x", expand=True, padx=8)
+        ttk.Label(wrap, text="Optional, all must hold: size>100M  size<1G  age>30d  age<12h  *.log*  re:^backup_",
+                  background=self.colors["panel"], foreground=self.colors["muted"],
+                  font=("Segoe UI", 9)).pack(anchor="w", pady=(0, 12))
+
         # File picker
         prow = ttk.Frame(wrap, style="Panel.TFrame")
         prow.pack(fill="x", pady=(0, 10))
-        ttk.Label(prow, text="Document:", background=self.colors["panel"], foreground=self.colors["muted"]).pack(side="left")
+        ttk.Label(prow, text="Document(s):", background=self.colors["panel"], foreground=self.colors["muted"]).pack(side="left")
         ttk.Entry(prow, textvariable=self.file_path).pack(side="left", fill="x", expand=True, padx=8)
         ttk.Button(prow, text="Choose", command=self._choose_file).pack(side="left")
+        ttk.Label(wrap, text='Several documents: separate with ";" or use a pattern like C:\\logs\\**\\*.log',
+                  background=self.colors["panel"], foreground=self.colors["muted"],
+                  font=("Segoe UI", 9)).pack(anchor="w", pady=(0, 6))
 
         # Progress + log
         self.progress = ttk.Progressbar(wrap, mode="determinate")
@@ -224,14 +323,33 @@ class ThanosSnapApp(tk.Tk):
                            insertbackground=self.colors["text"], relief="flat",
                            highlightthickness=1, highlightbackground="#1f2a38")
         self.log.pack(fill="both", expand=True)
+        self.log_note = ttk.Label(wrap, text="", background=self.colors["panel"],
+                                  foreground=self.colors["muted"], font=("Segoe UI", 9))
+        self.log_note.pack(anchor="w", pady=(4, 0))
 
         self._log("Select snap types, targets, and strength. Then preview or SNAP.")
 
     # ---------------- helpers ----------------
 
     def _log(self, msg: str):
-        from datetime import datetime
-        self.log.insert("end", f"[{datetime.now().strftime('%H:%M:%S')}] {msg}\n")
+        self._sink.write(msg)
+        if not self._log_flush_scheduled:
+            self._log_flush_scheduled = True
+            self.after(FRAME_MS, self._flush_log)
+
+    def _flush_log(self):
+        """One insert, one trim and one scroll per frame, however many lines arrived."""
+        self._log_flush_scheduled = False
+        lines = self._sink.drain()
+        if not lines:
+            return
+        self.log.insert("end", "".join(lines))
+        extra = int(self.log.index("end-1c").split(".")[0]) - 1 - self._sink.max_lines
+        if extra > 0:
+            self.log.delete("1.0", f"{extra + 1}.0")
+            if self._sink.spill_path is not None and not self.log_note.cget("text"):
+                self.log_note.configure(text=f"Showing the last {self._sink.max_lines} lines. "
+                                             f"Full log: {self._sink.spill_path}")
         self.log.see("end")
 
     def _refresh_quote(self):
@@ -246,11 +364,13 @@ class ThanosSnapApp(tk.Tk):
         self.do_folder_snap.set(True)
         self.do_doc_lines.set(True)
         self.do_doc_chars.set(True)
+        self.do_doc_bytes.set(True)
 
     def _clear_modes(self):
         self.do_folder_snap.set(False)
         self.do_doc_lines.set(False)
         self.do_doc_chars.set(False)
+        self.do_doc_bytes.set(False)
 
     def _select_only_all(self):
         self.ext_list.clear_selection()
@@ -269,16 +389,44 @@ class ThanosSnapApp(tk.Tk):
             self._log(f"Folder selected: {p}")
 
     def _choose_file(self):
-        p = filedialog.askopenfilename(
-            title="Choose a document/text file",
+        ps = filedialog.askopenfilenames(
+            title="Choose document/text file(s)",
             filetypes=[
                 ("Text-like files", "*.txt *.md *.csv *.log *.json *.xml *.yaml *.yml *.py *.java *.cpp *.c *.h *.hpp"),
                 ("All files", "*.*")
             ],
         )
-        if p:
-            self.file_path.set(p)
-            self._log(f"Document selected: {p}")
+        if ps:
+            self.file_path.set("; ".join(ps))
+            self._log(f"Document(s) selected: {len(ps)}" if len(ps) > 1 else f"Document selected: {ps[0]}")
+
+    def _selector(self) -> Optional[Selector]:
+        """The seed field as a Selector; None when blank (a fresh seed, or the previewed plan's)."""
+        if self.secure_random.get():
+            return Selector(secure=True)
+        seed = self.snap_seed.get().strip()
+        return Selector(int(seed)) if seed else None
+
+    def _seed_ok(self) -> bool:
+        try:
+            self._selector()
+            return True
+        except ValueError:
+            messagebox.showwarning("Seed", "The seed must be a whole number (or left blank).")
+            return False
+
+    def _doc_modes(self) -> list[str]:
+        picked = (("lines", self.do_doc_lines), ("chars", self.do_doc_chars), ("bytes", self.do_doc_bytes))
+        return [mode for mode, var in picked if var.get()]
+
+    def _doc_targets(self) -> list[Path]:
+        return jobs.expand_documents(self.file_path.get().split(";"))
+
+    def _trash_worker_count(self) -> int:
+        try:
+            return max(1, int(self.trash_workers.get()))
+        except (tk.TclError, ValueError):
+            return 1
 
     def _selected_ext_filter(self):
         chosen = self.ext_list.get_selected()
@@ -286,8 +434,19 @@ class ThanosSnapApp(tk.Tk):
             return None
         return normalize_exts(chosen)
 
+    def _file_filter(self) -> Optional[FileFilter]:
+        return FileFilter.parse(self.folder_filter.get())
+
+    def _filter_ok(self) -> bool:
+        try:
+            self._file_filter()
+            return True
+        except FilterError as e:
+            messagebox.showwarning("Folder filter", str(e))
+            return False
+
     def _validate_selection(self) -> bool:
-        if not (self.do_folder_snap.get() or self.do_doc_lines.get() or self.do_doc_chars.get()):
+        if not (self.do_folder_snap.get() or self._doc_modes()):
             messagebox.showwarning("No snap type selected", "Select at least one snap type.")
             return False
 
@@ -295,26 +454,43 @@ class ThanosSnapApp(tk.Tk):
             messagebox.showerror("Confirmation required", 'Type "I am inevitable" to enable snapping.')
             return False
 
+        if not self._seed_ok() or not self._filter_ok():
+            return False
+
         if self.do_folder_snap.get():
             if not self.folder_path.get().strip():
                 messagebox.showwarning("Folder required", "Folder Snap selected — choose a folder.")
                 return False
-
-        if self.do_doc_lines.get() or self.do_doc_chars.get():
+            if self.backup_enabled.get():
+                folder = Path(self.folder_path.get().strip()).resolve()
+                bdir = Path(self.backup_dir.get().strip() or (Path.home() / "ThanosSnapBackups")).resolve()
+                if bdir == folder or folder in bdir.parents:
+                    messagebox.showwarning("Backup location",
+                                           "The backup directory is inside the folder being snapped — choose another one.")
+                    return False
+
+        if self._doc_modes():
             if not self.file_path.get().strip():
                 messagebox.showwarning("Document required", "Document Snap selected — choose a document file.")
                 return False
+            if not self._doc_targets():
+                messagebox.showwarning("Document required", "No existing document matches the document field.")
+                return False
 
         return True
 
     # ---------------- Preview / Snap ----------------
 
     def preview(self):
-        if not (self.do_folder_snap.get() or self.do_doc_lines.get() or self.do_doc_chars.get()):
+        if not (self.do_folder_snap.get() or self._doc_modes()):
             messagebox.showwarning("No snap type selected", "Select at least one snap type.")
             return
 
+        if not self._seed_ok() or not self._filter_ok():
+            return
+
         strength = self.snap_strength.get()
+        selector = self._selector()
         self._log(f"Previewing snap plan at strength: {strength}%")
 
         # Folder preview
@@ -322,8 +498,14 @@ class ThanosSnapApp(tk.Tk):
             folder = Path(self.folder_path.get().strip())
             if folder.exists():
                 allowed_exts = self._selected_ext_filter()
-                plan = snap_folder.make_plan(folder, strength, allowed_exts)
-                self._log(f"[Folder] Candidates: {plan.total} | Would delete: {plan.to_remove} (to Trash)")
+                plan = snap_folder.make_plan(folder, strength, allowed_exts, self.folder_recursive.get(),
+                                             self.folder_streaming.get(), selector,
+                                             file_filter=self._file_filter())
+                self._plans["folder"] = plan
+                if plan.file_filter is not None:
+                    self._log(f"[Folder] Filter: {plan.file_filter.describe()}")
+                self._log(f"[Folder] Candidates: {plan.total} | Would delete: {plan.to_remove} (to Trash)"
+                          f" | Seed: {plan.seed}")
                 for name in plan.targets_preview:
                     self._log(f"  • {name}")
                 if plan.to_remove > len(plan.targets_preview):
@@ -332,24 +514,39 @@ class ThanosSnapApp(tk.Tk):
                 self._log("[Folder] Invalid folder path for preview.")
 
         # Document previews
-        if self.do_doc_lines.get():
-            f = Path(self.file_path.get().strip())
-            if f.exists():
-                plan = snap_file.make_plan(f, strength, "lines")
-                self._log(f"[Doc Lines] Total lines: {plan.total} | Would remove: {plan.to_remove} (permanent edit)")
-                for t in plan.targets_preview[:10]:
-                    self._log(f"  • {t}")
-            else:
-                self._log("[Doc Lines] Invalid file path for preview.")
-
-        if self.do_doc_chars.get():
-            f = Path(self.file_path.get().strip())
-            if f.exists():
-                plan = snap_file.make_plan(f, strength, "chars")
-                self._log(f"[Doc Chars] Total chars: {plan.total} | Would remove: {plan.to_remove} (permanent edit)")
-            else:
-                self._log("[Doc Chars] Invalid file path for preview.")
-
+        docs = self._doc_targets() if self._doc_modes() else []
+        if self._doc_modes():
+            if len(docs) > 1:
+                # planning every document would read them all: list them instead
+                self._log(f"[Docs] {len(docs)} documents match (permanent edit of each):")
+                for d in docs[:10]:
+                    self._log(f"  • {d}")
+                if len(docs) > 10:
+                    self._log(f"  …and {len(docs) - 10} more.")
+            elif not docs:
+                self._log("[Doc] Invalid file path for preview.")
+        # one seed for every document mode, as the snap itself uses
+        doc_selector = selector or Selector()
+
+        if self.do_doc_lines.get() and len(docs) == 1:
+            plan = snap_file.make_plan(docs[0], strength, "lines", doc_selector)
+            self._plans["lines"] = plan
+            self._log(f"[Doc Lines] Total lines: {plan.total} | Would remove: {plan.to_remove} (permanent edit)")
+            for t in plan.targets_preview[:10]:
+                self._log(f"  • {t}")
+
+        if self.do_doc_chars.get() and len(docs) == 1:
+            plan = snap_file.make_plan(docs[0], strength, "chars", doc_selector)
+            self._plans["chars"] = plan
+            self._log(f"[Doc Chars] Total chars: {plan.total} | Would remove: {plan.to_remove} (permanent edit)")
+
+        if self.do_doc_bytes.get() and len(docs) == 1:
+            plan = snap_file.make_plan(docs[0], strength, "bytes", doc_selector)
+            self._plans["bytes"] = plan
+            self._log(f"[Doc Bytes] Total bytes: {plan.total} | Would remove: {plan.to_remove} (permanent edit)")
+
+        if self._doc_modes() and len(docs) == 1:
+            self._log(f"[Doc] Seed: {doc_selector.seed}")
         self.status_var.set("Preview complete. No changes made.")
 
     def snap(self):
@@ -366,6 +563,8 @@ class ThanosSnapApp(tk.Tk):
             summary.append("• Document Snap (Lines): permanent edit")
         if self.do_doc_chars.get():
             summary.append("• Document Snap (Chars): permanent edit")
+        if self.do_doc_bytes.get():
+            summary.append("• Document Snap (Bytes): permanent edit")
 
         if not messagebox.askyesno(
             "Final Warning",
@@ -378,85 +577,160 @@ class ThanosSnapApp(tk.Tk):
 
         # Play animation then run
         def run_after_anim():
-            self._execute_snap()
+            self._start_snap()
 
-        if self.gauntlet_img:
-            anim = GauntletSnapAnimation(self, self.gauntlet_img, self.colors["bg"])
+        images = self._gauntlet_images()
+        if images:
+            anim = GauntletSnapAnimation(self, images, self.colors["bg"])
             anim.play(run_after_anim)
         else:
             run_after_anim()
 
-    def _execute_snap(self):
-        strength = self.snap_strength.get()
-        backup_dir = Path(self.backup_dir.get().strip() or (Path.home() / "ThanosSnapBackups"))
+    # ---------------- Snap worker ----------------
+
+    def _start_snap(self):
+        # Tk variables may only be read on this thread: capture everything the job needs
+        job = {
+            "strength": self.snap_strength.get(),
+            "backup_dir": Path(self.backup_dir.get().strip() or (Path.home() / "ThanosSnapBackups")),
+            "backup": self.backup_enabled.get(),
+            "backup_mode": self.backup_mode.get(),
+            "folder": Path(self.folder_path.get().strip()) if self.do_folder_snap.get() else None,
+            "allowed_exts": self._selected_ext_filter(),
+            "recursive": self.folder_recursive.get(),
+            "streaming": self.folder_streaming.get(),
+            "file_filter": self._file_filter(),
+            "workers": self._trash_worker_count(),
+            "docs": self._doc_targets() if self._doc_modes() else [],
+            "modes": self._doc_modes(),
+            "selector": self._selector(),
+        }
 
         self._refresh_quote()
         self.status_var.set("Snapping…")
+        self.progress["value"] = 0
+        self._progress.reset()
+        self._cancel.clear()
+        self.preview_btn.configure(state="disabled")
+        self.snap_btn.configure(state="disabled")
+        self.cancel_btn.configure(state="normal")
+
+        self._worker = threading.Thread(target=self._snap_worker, args=(job,), name="thanos-snap", daemon=True)
+        self._worker.start()
+        self.after(FRAME_MS, self._drain_events)
+
+    def _cancel_snap(self):
+        self._cancel.set()
+        self.cancel_btn.configure(state="disabled")
+        self.status_var.set("Cancelling…")
+
+    def _on_close(self):
+        if self._worker is None:
+            self._sink.close()
+            self.destroy()
+            return
+        # the worker is a daemon: closing now would kill it between trashing files and
+        # writing the snap's record
+        if messagebox.askyesno("Snap in progress",
+                               "A snap is running. Cancel it and close once it has stopped?\n\n"
+                               "Files already snapped are recorded for restore first."):
+            self._close_when_done = True
+            self._cancel_snap()
+            self.status_var.set("Cancelling… the window closes when the snap has stopped.")
+
+    def _post(self, msg: str):
+        """Log from the worker thread; the UI picks it up on its next frame."""
+        self._sink.write(msg)
+
+    def _drain_events(self):
+        self._flush_log()
+        while True:
+            try:
+                kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            self._finish_snap(kind, payload)
+
+        p = self._progress.value
+        if p is not None:
+            i, total = p
+            self.progress["maximum"] = max(total, 1)
+            self.progress["value"] = i
+
+        if self._worker is not None:
+            self.after(FRAME_MS, self._drain_events)
+
+    def _finish_snap(self, kind: str, payload):
+        self._worker = None
+        if self._close_when_done:
+            self._sink.close()
+            self.destroy()
+            return
+        self._plans.clear()
+        self.preview_btn.configure(state="normal")
+        self.snap_btn.configure(state="normal")
+        self.cancel_btn.configure(state="disabled")
+        self._refresh_quote()
 
-        # Backup + Folder snap
-        if self.do_folder_snap.get():
-            folder = Path(self.folder_path.get().strip())
-            allowed_exts = self._selected_ext_filter()
-
-            plan = snap_folder.make_plan(folder, strength, allowed_exts)
-            self._log(f"[Folder] Plan: {plan.to_remove}/{plan.total} to Trash")
-
-            # backup only the candidates chosen for deletion (safer & smaller)
-            if self.backup_enabled.get() and plan.to_remove > 0:
-                candidates = snap_folder.list_candidate_files(folder, allowed_exts)
-                # choose same set again? better: run execute list internally—so we do a deterministic plan.
-                # We'll rebuild the chosen list using the same function path:
-                # easiest approach: run a fresh execute AFTER backing up all candidates (less ideal) —
-                # Instead, create backup of ALL candidates (safe and simple).
-                self._log("[Folder] Creating backup of candidate files (safe mode)…")
-                bdir = backup_folder_files(candidates, backup_dir)
-                self._log(f"[Folder] Backup created: {bdir}")
-
-            # progress bar
-            self.progress["value"] = 0
-            self.progress["maximum"] = max(plan.to_remove, 1)
-
-            def prog(i, total):
-                self.progress["maximum"] = max(total, 1)
-                self.progress["value"] = i
-                self.update_idletasks()
-
-            deleted_ok, failed = snap_folder.execute(folder, strength, allowed_exts, progress_cb=prog)
-            self._log(f"[Folder] Done. Deleted to Trash: {deleted_ok} | Failed: {failed}")
-
-        # Document snap backups + execution
-        doc_path = None
-        if self.do_doc_lines.get() or self.do_doc_chars.get():
-            doc_path = Path(self.file_path.get().strip())
-
-            if self.backup_enabled.get():
-                b = backup_file(doc_path, backup_dir)
-                self._log(f"[Doc] Backup created: {b}")
-
-        if self.do_doc_lines.get():
-            self.progress["value"] = 0
-            self.progress["maximum"] = 1
-
-            def prog(i, total):
-                self.progress["maximum"] = max(total, 1)
-                self.progress["value"] = i
-                self.update_idletasks()
-
-            removed, kept = snap_file.execute(Path(self.file_path.get().strip()), strength, "lines", progress_cb=prog)
-            self._log(f"[Doc Lines] Removed: {removed} | Kept: {kept}")
+        if kind == "done" and payload:
+            self.status_var.set("Snap finished with problems.")
+            for problem in payload:
+                self._log(f"Warning: {problem}")
+            messagebox.showwarning("Snap finished with problems", "\n\n".join(payload))
+        elif kind == "done":
+            self.status_var.set("It is done.")
+            messagebox.showinfo("Snap Complete", "Perfectly balanced… as all things should be.")
+        elif kind == "cancelled":
+            self.status_var.set("Snap cancelled.")
+            self._log("Snap cancelled. Anything not yet snapped was left untouched.")
+        else:
+            self.status_var.set("Snap failed.")
+            self._log(f"Snap failed: {payload}")
+            messagebox.showerror("Snap failed", str(payload))
 
-        if self.do_doc_chars.get():
-            self.progress["value"] = 0
-            self.progress["maximum"] = 1
+    def _snap_worker(self, job: dict):
+        try:
+            problems = self._execute_snap(job)
+        except SnapCancelled:
+            self._events.put(("cancelled", None))
+        except Exception as e:
+            self._events.put(("error", e))
+        else:
+            self._events.put(("cancelled", None) if self._cancel.is_set() else ("done", problems))
 
-            def prog2(i, total):
-                self.progress["maximum"] = max(total, 1)
-                self.progress["value"] = i
-                self.update_idletasks()
+    def _execute_snap(self, job: dict) -> list[str]:
+        """
+        Runs on the worker thread: no Tk calls here, only _post() and the progress slot.
+        Returns what went wrong without stopping the snap (failed backups, files kept, ...).
+        """
+        strength = job["strength"]
+        backup_dir = job["backup_dir"] if job["backup"] else None
+        problems: list[str] = []
 
-            removed, kept = snap_file.execute(Path(self.file_path.get().strip()), strength, "chars", progress_cb=prog2)
-            self._log(f"[Doc Chars] Removed: {removed} | Kept: {kept}")
+        # Backup + Folder snap
+        if job["folder"] is not None:
+            folder = job["folder"]
+            result = jobs.run_folder_snap(folder, strength, job["allowed_exts"], job["recursive"],
+                                          plan=self._plans.get("folder"), backup_dir=backup_dir,
+                                          backup_mode=job["backup_mode"], workers=job["workers"],
+                                          progress_cb=self._progress, cancel=self._cancel, log=self._post,
+                                          streaming=job["streaming"], selector=job["selector"],
+                                          file_filter=job["file_filter"])
+            problems += _problems(result)
+            if self._cancel.is_set():
+                return problems
 
-        self._refresh_quote()
-        self.status_var.set("It is done.")
-        messagebox.showinfo("Snap Complete", "Perfectly balanced… as all things should be.")
+        # Document snap backups + execution
+        modes = job["modes"]
+        if len(job["docs"]) == 1:
+            result = jobs.run_document_snap(job["docs"][0], strength, modes, plans=self._plans,
+                                            backup_dir=backup_dir, backup_mode=job["backup_mode"],
+                                            progress_cb=self._progress, cancel=self._cancel, log=self._post,
+                                            selector=job["selector"])
+            problems += _problems(result)
+        elif job["docs"]:
+            result = jobs.run_documents_snap(job["docs"], strength, modes, backup_dir=backup_dir,
+                                             backup_mode=job["backup_mode"], progress_cb=self._progress,
+                                             cancel=self._cancel, log=self._post, selector=job["selector"])
+            problems += _problems(result)
+        return problems
@@ -0,0 +1,59 @@
+from __future__ import annotations
+from concurrent.futures import Future
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+import hashlib
+import threading
+
+from core.utils import cache_dir, write_cache
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+def _digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+def _cached(digest: str, height: int) -> Path:
+    return cache_dir() / "gauntlet" / f"{digest[:32]}-{height}.png"
+
+def _save(img: Image.Image, dst: Path) -> None:
+    write_cache(dst, lambda f: img.save(f, format="PNG"))
+
+def render(path: Path, heights: Iterable[int]) -> dict[int, Image.Image]:
+    """
+    The asset resized (LANCZOS) to each height, keeping its aspect ratio. Sizes are cached
+    on disk by asset hash and height, so the full-size image is only decoded when the
+    asset or a requested size is new.
+    """
+    from PIL import Image  # the app starts this on a thread: Pillow loads off the Tk thread too
+
+    digest = _digest(path)
+    out: dict[int, Image.Image] = {}
+    base = None
+    for h in sorted(set(heights)):
+        cached = _cached(digest, h)
+        try:
+            with Image.open(cached) as im:
+                out[h] = im.convert("RGBA")
+            continue
+        except (OSError, ValueError):
+            pass
+        if base is None:
+            base = Image.open(path).convert("RGBA")
+        out[h] = base.resize((int(base.width * h / base.height), h), Image.LANCZOS)
+        _save(out[h], cached)
+    return out
+
+def prerender(path: Path, heights: Iterable[int]) -> Future:
+    """render() on a background thread. Tk images must still be made on the Tk thread."""
+    fut: Future = Future()
+    heights = list(heights)
+
+    def run():
+        try:
+            fut.set_result(render(path, heights))
+        except BaseException as e:
+            fut.set_exception(e)
+
+    threading.Thread(target=run, name="thanos-gauntlet", daemon=True).start()
+    return fut